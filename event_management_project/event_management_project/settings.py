@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so it sees the whole request; inactive unless REQUEST_METRICS_ENABLED
+    "events.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -58,14 +61,30 @@ ROOT_URLCONF = "event_management_project.urls"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Trusts token claims on read/registration actions; caches users for the rest
+        'events.authentication.TokenUserJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication', # Keep for browsable API
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # JSON through orjson when it is installed (pip install orjson), else DRF's stdlib encoder
+    'DEFAULT_RENDERER_CLASSES': (
+        'events.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'events.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10 # Default page size for pagination
+    'PAGE_SIZE': 10, # Default page size for pagination
+    # Token buckets for register/waitlist_toggle (events.throttling); None disables one
+    'DEFAULT_THROTTLE_RATES': {
+        'registration_user': '20/min',
+        'registration_event': '100/s',
+    },
 }
 
 from datetime import timedelta
@@ -73,8 +92,14 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Adds the username and login-time claims read by TokenUserJWTAuthentication
+    'TOKEN_OBTAIN_SERIALIZER': 'events.serializers.UserTokenObtainPairSerializer',
 }
 
+# In-process cache of authenticated users (seconds / entries per worker)
+AUTH_USER_CACHE_TIMEOUT = 60
+AUTH_USER_CACHE_SIZE = 1024
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -103,6 +128,74 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile (DJANGO_DB_PROFILE=production):
+# WAL lets readers run alongside the single writer, IMMEDIATE transactions take the
+# write lock up front (so they wait on busy_timeout instead of failing on upgrade),
+# and connections are kept open between requests and health-checked before reuse.
+SQLITE_PRODUCTION_OPTIONS = {
+    "timeout": 20,  # seconds to wait on SQLITE_BUSY
+    "transaction_mode": "IMMEDIATE",
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA mmap_size=268435456;"  # 256 MiB
+        "PRAGMA cache_size=-65536;"  # 64 MiB
+        "PRAGMA temp_store=MEMORY;"
+    ),
+}
+
+if os.environ.get("DJANGO_DB_PROFILE") == "production":
+    DATABASES["default"].update({
+        "OPTIONS": SQLITE_PRODUCTION_OPTIONS,
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+    })
+    # Optional read-only connection for queries outside a write transaction
+    if os.environ.get("DJANGO_DB_READ_ONLY_REPLICA") == "1":
+        DATABASES["readonly"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": f"file:{DATABASES['default']['NAME']}?mode=ro",
+            "OPTIONS": {**SQLITE_PRODUCTION_OPTIONS, "uri": True, "transaction_mode": "DEFERRED"},
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            "TEST": {"MIRROR": "default"},
+        }
+        DATABASE_ROUTERS = ["events.db.ReadOnlyReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; use the file-based (or a shared) backend so that
+# invalidations reach every gunicorn worker.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "event-management",
+    }
+}
+
+# Cache used for public event/comment responses, and how long entries live (seconds)
+EVENT_CACHE_ALIAS = "default"
+EVENT_CACHE_TIMEOUT = 300
+
+# How long a full event is remembered, to turn away registrations without locking its
+# row (seconds; 0 disables)
+EVENT_FULL_CACHE_TIMEOUT = 30
+
+# Comment streams (/api/v1/async/events/{id}/comments/stream/, ASGI only): how often each
+# stream checks for new comments, the keep-alive interval, and when it ends (seconds)
+COMMENT_STREAM_POLL_SECONDS = 1
+COMMENT_STREAM_HEARTBEAT_SECONDS = 15
+COMMENT_STREAM_MAX_SECONDS = 300
+
+
+# Per-endpoint latency/query histograms, served at /api/v1/_metrics. A request that runs
+# one SQL statement shape more than the threshold number of times is logged as an N+1.
+
+REQUEST_METRICS_ENABLED = os.environ.get("DJANGO_REQUEST_METRICS") == "1"
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class EventsConfig(AppConfig):
     name = "events"
+
+    def ready(self):
+        # Connect model signal handlers (denormalised counters, etc.)
+        from . import signals  # noqa: F401
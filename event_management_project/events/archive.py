@@ -0,0 +1,128 @@
+"""
+Moves finished events, with their attendees, waitlist and comments, from the
+live tables into the archive tables (``Archived*`` models).
+
+Work is split into short transactions so writers are never blocked for long:
+each batch first copies its event rows, then moves related rows a chunk at a
+time (copy + delete in one transaction), and finally deletes the events. Every
+step is idempotent, so a run that stops part-way is completed by the next one.
+"""
+import time
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .caching import invalidate_comments
+from .db import retry_on_busy
+from .models import (
+    ArchivedAttendance, ArchivedComment, ArchivedEvent, ArchivedWaitlistEntry, Comment, Event, WaitlistEntry,
+)
+from .registration import Attendance
+
+ARCHIVE_BATCH_SIZE = 200
+ARCHIVE_CHUNK_SIZE = 500
+
+EVENT_FIELDS = tuple(
+    field.attname for field in ArchivedEvent._meta.concrete_fields if field.name != 'archived_at'
+)
+
+# (label, live model, archive model, {live column: archive column})
+RELATED_ROWS = [
+    ('attendees', Attendance, ArchivedAttendance, {'event_id': 'event_id', 'customuser_id': 'user_id'}),
+    ('waitlist', WaitlistEntry, ArchivedWaitlistEntry, {
+        'event_id': 'event_id', 'user_id': 'user_id', 'position': 'position', 'joined_at': 'joined_at',
+    }),
+    ('comments', Comment, ArchivedComment, {
+        'id': 'id', 'event_id': 'event_id', 'user_id': 'user_id', 'content': 'content',
+        'rating': 'rating', 'created_at': 'created_at',
+    }),
+]
+
+
+def _delete_rows(model, pks):
+    """
+    DELETE by primary key in plain SQL. This skips the per-row post_delete
+    signals, e.g. comment rating updates for an event that is being removed.
+    """
+    connection = connections[router.db_for_write(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', pks)
+
+
+@retry_on_busy
+@transaction.atomic
+def copy_events(event_ids):
+    rows = Event.objects.filter(pk__in=event_ids).values(*EVENT_FIELDS)
+    ArchivedEvent.objects.bulk_create([ArchivedEvent(**row) for row in rows], ignore_conflicts=True)
+
+
+@retry_on_busy
+@transaction.atomic
+def move_chunk(model, archive_model, columns, event_ids, chunk_size):
+    """Move one chunk of `model` rows for the events; returns how many were moved."""
+    rows = list(
+        model.objects.filter(event_id__in=event_ids).order_by('pk').values('pk', *columns)[:chunk_size]
+    )
+    if not rows:
+        return 0
+    archive_model.objects.bulk_create(
+        [archive_model(**{target: row[source] for source, target in columns.items()}) for row in rows],
+        ignore_conflicts=True,
+    )
+    _delete_rows(model, [row['pk'] for row in rows])
+    return len(rows)
+
+
+@retry_on_busy
+@transaction.atomic
+def delete_events(event_ids):
+    # Related rows are gone by now, so this only removes the events (and their day buckets)
+    Event.objects.filter(pk__in=event_ids).delete()
+
+
+def archive_batch(event_ids, chunk_size=ARCHIVE_CHUNK_SIZE, pause=0):
+    """Archive the given events; returns the number of rows moved per kind."""
+    moved = {'events': len(event_ids)}
+    copy_events(event_ids)
+    for label, model, archive_model, columns in RELATED_ROWS:
+        total = 0
+        while True:
+            count = move_chunk(model, archive_model, columns, event_ids, chunk_size)
+            total += count
+            if count < chunk_size:
+                break
+            time.sleep(pause)
+        moved[label] = total
+    delete_events(event_ids)
+    for event_id in event_ids:
+        invalidate_comments(event_id)
+    return moved
+
+
+def archive_events(older_than, batch_size=ARCHIVE_BATCH_SIZE, chunk_size=ARCHIVE_CHUNK_SIZE, pause=0,
+                   limit=None):
+    """
+    Archive events that took place before `older_than`, oldest first, `batch_size`
+    events at a time with `pause` seconds between transactions. Yields each batch's
+    row counts so callers can report progress.
+    """
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        event_ids = list(
+            Event.objects.filter(date_and_time__lt=older_than)
+            .order_by('date_and_time', 'id').values_list('pk', flat=True)[:size]
+        )
+        if not event_ids:
+            return
+        yield archive_batch(event_ids, chunk_size=chunk_size, pause=pause)
+        archived += len(event_ids)
+        time.sleep(pause)
+
+
+def archive_cutoff(days):
+    """Events that took place more than `days` days ago are archived."""
+    return timezone.now() - timedelta(days=days)
@@ -0,0 +1,144 @@
+"""
+Async (ASGI) versions of the public read endpoints.
+
+DRF views are synchronous, so these are plain Django async views using the async
+ORM. Under an ASGI server (uvicorn workers) a slow database call no longer ties
+up a worker thread. The list takes the sync list's filters (EventFilter) and the
+detail returns the full event, as the sync endpoints do. Pages use an opaque
+keyset cursor (`?cursor=`) in date order, so `?q=` matches are not ranked and
+`?ordering=` is not supported.
+"""
+import base64
+import binascii
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .feed import comment_events
+from .filters import EventFilter
+from .models import Comment, CustomUser, Event
+from .serializers import CommentSerializer, EventListSerializer, EventSerializer
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(timestamp, pk):
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(timestamp, pk) from a cursor, or None if it is malformed."""
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return parse_datetime(timestamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+async def keyset_page(request, queryset, order_field):
+    """One page of `queryset` ordered by (order_field, id), resuming after `?cursor=`."""
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None or position[0] is None:
+            return None, None
+        timestamp, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{order_field}__gt': timestamp}) | Q(**{order_field: timestamp, 'id__gt': pk})
+        )
+    size = _page_size(request)
+    rows = [row async for row in queryset.order_by(order_field, 'id')[:size + 1].aiterator()]
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, order_field), last.pk)
+    return rows, next_cursor
+
+
+def invalid_cursor():
+    return JsonResponse({'detail': 'Invalid cursor.'}, status=404)
+
+
+def filter_events(params, queryset):
+    """(queryset, None) narrowed by the EventFilter `params`, or (None, errors) if they are invalid."""
+    filterset = EventFilter(params, queryset=queryset)
+    if not filterset.is_valid():
+        return None, {name: list(messages) for name, messages in filterset.errors.items()}
+    return filterset.qs, None
+
+
+async def event_list(request):
+    """Upcoming events, soonest first, filtered like the sync list."""
+    upcoming = Event.objects.filter(date_and_time__gte=timezone.now()).select_related('organizer')
+    # Category names resolve through the category cache and the search backend is picked
+    # by introspection; both may run a sync query
+    upcoming, errors = await sync_to_async(filter_events)(request.GET, upcoming)
+    if errors:
+        return JsonResponse(errors, status=400)
+    events, next_cursor = await keyset_page(request, upcoming, 'date_and_time')
+    if events is None:
+        return invalid_cursor()
+    return JsonResponse({'next': next_cursor, 'results': EventListSerializer(events, many=True).data})
+
+
+async def event_detail(request, pk):
+    """One upcoming event with its attendee and waitlist ids, as the sync detail returns it."""
+    member_ids = CustomUser.objects.only('id')
+    try:
+        event = await Event.objects.select_related('organizer').prefetch_related(
+            Prefetch('attendees', queryset=member_ids),
+            Prefetch('waitlist', queryset=member_ids),
+        ).aget(pk=pk, date_and_time__gte=timezone.now())
+    except Event.DoesNotExist:
+        return JsonResponse({'detail': 'No Event matches the given query.'}, status=404)
+    return JsonResponse(EventSerializer(event).data)
+
+
+async def comment_list(request, event_pk):
+    """An event's comments, oldest first, with the total count."""
+    if not await Event.objects.filter(pk=event_pk).aexists():
+        return JsonResponse({'detail': 'No Event matches the given query.'}, status=404)
+    comments = Comment.objects.filter(event_id=event_pk).select_related('user')
+    page, next_cursor = await keyset_page(request, comments, 'created_at')
+    if page is None:
+        return invalid_cursor()
+    return JsonResponse({
+        'count': await comments.acount(),
+        'next': next_cursor,
+        'results': CommentSerializer(page, many=True).data,
+    })
+
+
+async def comment_stream(request, event_pk):
+    """
+    Server-Sent Events stream of an event's new comments. Resumes after the
+    Last-Event-ID header (sent by EventSource on reconnect) or `?since_id=`;
+    without either it starts from the latest comment.
+    """
+    if not await Event.objects.filter(pk=event_pk).aexists():
+        return JsonResponse({'detail': 'No Event matches the given query.'}, status=404)
+    since_id = request.headers.get('Last-Event-ID') or request.GET.get('since_id')
+    if since_id is None:
+        since_id = await Comment.objects.filter(event_id=event_pk).order_by('-id').values_list('id', flat=True).afirst()
+    try:
+        since_id = int(since_id or 0)
+    except ValueError:
+        return JsonResponse({'since_id': ['A valid integer is required.']}, status=400)
+    response = StreamingHttpResponse(comment_events(event_pk, since_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,133 @@
+"""
+JWT authentication that does not load the user row on every request.
+
+simplejwt's ``JWTAuthentication`` SELECTs the user for each authenticated call.
+Views can list actions in ``token_user_actions`` that only need the caller's id
+(reads, registration toggles); for those the signed claims are trusted and a
+``TokenUser`` is returned without touching the database. Every other action
+gets a full ``CustomUser``, served from a small per-process TTL cache.
+
+Deactivating a user, changing their password or deleting them records a
+revocation time in the event cache (``revoke_tokens``); tokens whose login
+predates it are rejected on both paths. With the default locmem cache that
+record only reaches the current process, so run several workers against a
+shared cache backend.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .caching import get_cache
+
+# Claim holding the original login time; refreshed access tokens copy it, unlike 'iat'
+AUTH_TIME_CLAIM = 'auth_time'
+
+
+class UserCache:
+    """
+    A bounded, thread-safe map of user id -> user that forgets entries after `timeout` seconds.
+    Ids are keyed as strings: token claims carry them as strings, model instances as ints.
+    """
+
+    def __init__(self, timeout, maxsize):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # A copy, so one request cannot mutate the user another request sees
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        user_id = str(user_id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.timeout, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60),
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+)
+
+# --- Revocation ---
+
+def revoked_key(user_id):
+    return f'auth:revoked:{user_id}'
+
+
+def revoke_tokens(user_id):
+    """Reject every token for `user_id` issued before now and drop the cached user."""
+    user_cache.evict(user_id)
+    # No token outlives the refresh lifetime, so neither does the record
+    lifetime = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+    get_cache().set(revoked_key(user_id), time.time(), timeout=lifetime)
+
+
+def check_not_revoked(validated_token, user_id):
+    revoked_at = get_cache().get(revoked_key(user_id))
+    if revoked_at is None:
+        return
+    issued_at = validated_token.get(AUTH_TIME_CLAIM, validated_token.get('iat', 0))
+    if issued_at < revoked_at:
+        raise AuthenticationFailed(_('Token has been revoked.'), code='token_revoked')
+
+# --- Authentication ---
+
+class TokenUserJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the token's claims for the view's
+    `token_user_actions` and caches full users for everything else.
+    """
+
+    def authenticate(self, request):
+        # The view is not passed to get_user(), so note which action is being served
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        action = getattr(view, 'action', None)
+        self.trust_claims = action is not None and action in getattr(view, 'token_user_actions', ())
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not getattr(self, 'trust_claims', False):
+            return self.get_full_user(validated_token, user_id)
+        check_not_revoked(validated_token, user_id)
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    def get_full_user(self, validated_token, user_id):
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        check_not_revoked(validated_token, user_id)
+        return user
@@ -0,0 +1,644 @@
+"""
+Benchmark suite (``manage.py benchmark_api``).
+
+Every scenario runs in-process on one database seeded by ``seeding.seed_database``,
+with the response cache and the registration throttles off unless the run (or the
+scenario, see ``NEEDS``) asks for them. Most scenarios drive the API through
+Django's test client; the rest time a single layer (rendering, search, list
+serialisation, SQLite write locking) and come in pairs to compare two
+implementations. Every request or call is one sample: it is timed and, where
+the work happens on the calling thread, its queries are counted. A scenario's
+summary has p50/p95/p99 latency, throughput, queries per request, response size and
+a status tally. Summaries are plain dicts, so a run can be saved as JSON and compared
+with a run from another commit.
+"""
+import asyncio
+import io
+import math
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.db.models import Count, Prefetch
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import discovery, renderers
+from .authentication import TokenUserJWTAuthentication, user_cache
+from .caching import get_cache
+from .db import is_busy_error
+from .metrics import QueryRecorder
+from .models import Category, Comment, CustomUser, Event
+from .registration import Attendance, toggle_registration
+from .search import IContainsSearchBackend, get_search_backend
+from .serializers import EventListSerializer, EventSerializer, UserTokenObtainPairSerializer
+from .signals import refresh_counters
+from .views import EventViewSet
+
+EVENTS_URL = '/api/v1/events/'
+
+# The response cache would hide the request path being measured
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# Benchmark users register far more often than the per-user bucket allows
+NO_THROTTLES = {'registration_user': None, 'registration_event': None}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def body_size(response):
+    """Bytes in a response body, or None for a streamed one (reading it would change the timing)."""
+    return None if response.streaming else len(response.content)
+
+
+def auth_client(user):
+    token = UserTokenObtainPairSerializer.get_token(user).access_token
+    return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class ScenarioRun:
+    """Collects one sample per request (or timed call); safe to share between threads."""
+
+    def __init__(self):
+        self.client = Client()
+        self.latencies = []
+        self.queries = []
+        self.statuses = Counter()
+        self.queries_by_status = defaultdict(list)
+        self.sizes = []
+        self.lock = threading.Lock()
+
+    def record(self, milliseconds, status=None, queries=None, size=None):
+        with self.lock:
+            self.latencies.append(milliseconds)
+            if size is not None:
+                self.sizes.append(size)
+            if status is not None:
+                self.statuses[status] += 1
+            if queries is not None:
+                self.queries.append(queries)
+                if status is not None:
+                    self.queries_by_status[status].append(queries)
+
+    def request(self, method, path, data=None, client=None):
+        client = client or self.client
+        # Counted by a wrapper: CaptureQueriesContext stops counting once the query log is full
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            elapsed = time.perf_counter() - started
+        self.record(elapsed * 1000, response.status_code, recorder.count, body_size(response))
+        return response
+
+    async def arequest(self, client, path):
+        # The async ORM runs queries on another thread, so they are not counted
+        started = time.perf_counter()
+        response = await client.get(path)
+        self.record((time.perf_counter() - started) * 1000, response.status_code, size=body_size(response))
+        return response
+
+    def call(self, func, *args):
+        """
+        Time one call of `func` that is not an HTTP request (no status is recorded). A
+        bytes result is taken as a rendered body and its size recorded.
+        """
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            result = func(*args)
+            elapsed = time.perf_counter() - started
+        self.record(elapsed * 1000, queries=recorder.count, size=len(result) if isinstance(result, bytes) else None)
+        return result
+
+    def get(self, path, data=None, client=None):
+        return self.request('get', path, data, client)
+
+    def post(self, path, data=None, client=None):
+        return self.request('post', path, data, client)
+
+    def follow_pages(self, path, pages, data=None):
+        """GET `path` and then up to `pages - 1` of its `next` links; returns every result."""
+        results = []
+        for _ in range(pages):
+            response = self.get(path, data)
+            if response.status_code != 200:
+                break
+            body = response.json()
+            results += body['results']
+            path, data = body.get('next'), None
+            if not path:
+                break
+        return results
+
+    def summary(self, seconds):
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {'requests': 0}
+        summary = {
+            'requests': len(latencies),
+            'seconds': round(seconds, 3),
+            'throughput_rps': round(len(latencies) / seconds, 1) if seconds else None,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'statuses': {str(code): count for code, count in sorted(self.statuses.items(), key=str)},
+            'queries_by_status': {
+                str(code): round(statistics.mean(counts), 2)
+                for code, counts in sorted(self.queries_by_status.items(), key=str)
+            },
+        }
+        if self.queries:
+            summary['queries_per_request'] = {
+                'mean': round(statistics.mean(self.queries), 2),
+                'max': max(self.queries),
+            }
+        if self.sizes:
+            summary['response_kib'] = {
+                'mean': round(statistics.mean(self.sizes) / 1024, 2),
+                'max': round(max(self.sizes) / 1024, 2),
+            }
+        return summary
+
+# --- Scenarios ---
+
+def browse_events(run, rng, iterations):
+    """Page through the upcoming events list and open some of the events on each page."""
+    for _ in range(iterations):
+        events = run.follow_pages(EVENTS_URL, pages=5)
+        for event in rng.sample(events, k=min(3, len(events))):
+            run.get(f"{EVENTS_URL}{event['id']}/")
+
+
+def filter_events(run, rng, iterations):
+    """List events by category (popular categories more often) and by one-week date windows."""
+    names = list(
+        Category.objects.annotate(events=Count('event')).order_by('-events').values_list('name', flat=True)
+    )
+    weights = [1 / rank for rank in range(1, len(names) + 1)]
+    now = timezone.now()
+    for _ in range(iterations):
+        if names:
+            run.follow_pages(EVENTS_URL, pages=2, data={'category': rng.choices(names, weights)[0]})
+        start = now + timedelta(days=rng.randrange(0, 180))
+        run.follow_pages(EVENTS_URL, pages=2, data={
+            'date_range_start': start.isoformat(),
+            'date_range_end': (start + timedelta(days=7)).isoformat(),
+        })
+
+
+def registration_rush(run, rng, iterations):
+    """
+    Many users register for one small event at once. Whoever misses out joins the
+    waitlist, and then some attendees cancel, which promotes waitlisted users.
+    """
+    users = list(CustomUser.objects.order_by('pk')[:max(2, iterations * 10)])
+    organizer = users[0]
+    event = Event.objects.create(
+        title='Benchmark rush', description='Benchmark', location='Main hall', organizer=organizer,
+        date_and_time=timezone.now() + timedelta(days=30), capacity=max(1, len(users) // 2),
+    )
+    path = f'{EVENTS_URL}{event.pk}/'
+    clients = [auth_client(user) for user in users]
+    rng.shuffle(clients)
+    turned_away = []
+    for client in clients:
+        if run.post(path + 'register/', client=client).status_code != 201:
+            turned_away.append(client)
+    for client in turned_away:
+        run.post(path + 'waitlist_toggle/', client=client)
+    # Cancellations free seats for the waitlist
+    for client in clients[:len(clients) // 4]:
+        run.post(path + 'register/', client=client)
+
+
+def ticket_rush(run, rng, users, capacity, rounds=3):
+    """
+    All `users` go for one event with `capacity` seats at the same moment. Whoever is
+    turned away (event full, or throttled) tries again, up to `rounds` attempts each.
+    """
+    event = Event.objects.create(
+        title='Ticket rush', description='Benchmark', location='Arena', organizer=users[0],
+        date_and_time=timezone.now() + timedelta(days=30), capacity=capacity,
+    )
+    path = f'{EVENTS_URL}{event.pk}/register/'
+    waiting = [auth_client(user) for user in users]
+    for _ in range(rounds):
+        rng.shuffle(waiting)
+        waiting = [client for client in waiting if run.post(path, client=client).status_code != 201]
+        if not waiting:
+            break
+    return event
+
+
+def read_comments(run, rng, iterations):
+    """Read the comment threads of the most-discussed events, a few pages each."""
+    busiest = list(
+        Comment.objects.values('event_id').annotate(total=Count('id')).order_by('-total')
+        .values_list('event_id', flat=True)[:10]
+    )
+    for _ in range(iterations):
+        if busiest:
+            run.follow_pages(f'{EVENTS_URL}{rng.choice(busiest)}/comments/', pages=3)
+
+
+# --- Comparisons: the same work done in different ways ---
+
+def toggle_membership(run, rng, iterations, authentication):
+    """
+    One user toggles their registration for an open event and their place on a full
+    event's waitlist, five times each per iteration, authenticated with `authentication`
+    (simplejwt's JWTAuthentication loads the user; the token-user fast path does not).
+    """
+    user, _ = CustomUser.objects.get_or_create(username='bench_auth')
+    client = auth_client(user)
+    events = {}
+    for action, capacity in (('register', 10), ('waitlist_toggle', 1)):
+        events[action], created = Event.objects.get_or_create(
+            title=f'Benchmark {action}', organizer=user,
+            defaults={'description': 'Benchmark', 'location': 'Here', 'capacity': capacity,
+                      'date_and_time': timezone.now() + timedelta(days=30)},
+        )
+        if created and action == 'waitlist_toggle':
+            # Only a full event has a waitlist to join
+            toggle_registration(events[action].pk, CustomUser.objects.exclude(pk=user.pk).first().pk)
+
+    original = EventViewSet.authentication_classes
+    EventViewSet.authentication_classes = [authentication, SessionAuthentication]
+    user_cache.clear()
+    try:
+        for _ in range(iterations * 5):
+            for action, event in events.items():
+                run.post(f'{EVENTS_URL}{event.pk}/{action}/', client=client)
+    finally:
+        EventViewSet.authentication_classes = original
+
+
+def crowded_rush(run, rng, iterations, full_cache=True):
+    """
+    `ticket_rush` of 50 users per iteration for seats for one in 20 of them. Without
+    `full_cache` every attempt is answered by the database instead of the cached
+    "event full" state. (The ``_throttled`` variant runs with the throttles on.)
+    """
+    users = list(CustomUser.objects.order_by('pk')[:iterations * 50])
+    with override_settings(**({} if full_cache else {'EVENT_FULL_CACHE_TIMEOUT': 0})):
+        event = ticket_rush(run, rng, users, capacity=max(1, len(users) // 20))
+    event.refresh_from_db()
+    assert event.attendees_count <= event.capacity
+
+
+# Sessions of the festival every sign-up registers for
+FESTIVAL_SESSIONS = 20
+
+
+def festival_signup(run, rng, iterations, batched):
+    """
+    One user per iteration signs up for every session of a festival, with one
+    ``register`` call per session or a single ``register-batch`` call. Each
+    sign-up is one sample, so the two variants compare per sign-up.
+    """
+    users = list(CustomUser.objects.order_by('pk')[:iterations])
+    start = timezone.now() + timedelta(days=60)
+    event_ids = [event.pk for event in Event.objects.bulk_create([
+        Event(title=f'Session {n}', description='Benchmark', location='Festival', organizer=users[0],
+              date_and_time=start + timedelta(hours=n), capacity=len(users))
+        for n in range(FESTIVAL_SESSIONS)
+    ])]
+
+    def sign_up(client):
+        if batched:
+            client.post(f'{EVENTS_URL}register-batch/', {'events': event_ids}, content_type='application/json')
+        else:
+            for event_id in event_ids:
+                client.post(f'{EVENTS_URL}{event_id}/register/')
+
+    for user in users:
+        run.call(sign_up, auth_client(user))
+
+
+# Fields of the event create body that the parsers are timed on
+BODY_FIELDS = ('title', 'description', 'date_and_time', 'location', 'capacity', 'category', 'latitude', 'longitude')
+
+
+def encode_json(run, rng, iterations, renderer_class, parser_class):
+    """
+    Render event list pages of 10 and 100, a detail page of 10 events and a calendar
+    month, and parse an event create body, ten times per iteration.
+    """
+    if renderers.orjson is None and parser_class is renderers.ORJSONParser:
+        return  # Without orjson the variants would time the same stdlib code
+    upcoming = Event.objects.filter(date_and_time__gte=timezone.now()).order_by('date_and_time')
+    payloads = [
+        EventListSerializer(upcoming.select_related('organizer')[:size], many=True).data for size in (10, 100)
+    ]
+    payloads += [
+        EventSerializer(upcoming.select_related('organizer').prefetch_related('attendees', 'waitlist')[:10],
+                        many=True).data,
+        # Raw date objects, encoded by the renderer itself
+        discovery.month_counts(upcoming.first().date_and_time.date().replace(day=1)),
+    ]
+    event = EventSerializer(upcoming.first()).data
+    body = JSONRenderer().render({field: event[field] for field in BODY_FIELDS})
+    renderer, parser = renderer_class(), parser_class()
+    for _ in range(iterations * 10):
+        for data in payloads:
+            run.call(renderer.render, data)
+        run.call(lambda: parser.parse(io.BytesIO(body), 'application/json', {}))
+
+
+# Events on the crowded list page
+CROWDED_PAGE_SIZE = 10
+
+
+def crowded_event_ids():
+    """
+    A page of events that every seeded user attends, created on first use. They are
+    dated after all seeded events, so they never show up in the other scenarios.
+    """
+    event_ids = list(Event.objects.filter(title='Crowded event').values_list('pk', flat=True))
+    if event_ids:
+        return event_ids
+    start = timezone.now() + timedelta(days=5 * 365)
+    organizer = CustomUser.objects.order_by('pk').first()
+    event_ids = [event.pk for event in Event.objects.bulk_create([
+        Event(title='Crowded event', description='Benchmark', location='Stadium', organizer=organizer,
+              date_and_time=start + timedelta(hours=n), capacity=1_000_000)
+        for n in range(CROWDED_PAGE_SIZE)
+    ])]
+    user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+    for event_id in event_ids:
+        Attendance.objects.bulk_create(
+            [Attendance(event_id=event_id, customuser_id=user_id) for user_id in user_ids], batch_size=5000,
+        )
+    refresh_counters(event_ids)
+    return event_ids
+
+
+def crowded_list_page(run, rng, iterations, compact):
+    """
+    Load, serialise and render a list page of events with every user attending, in the
+    compact representation or the full one the list used to serve (attendee and
+    waitlist ids). One sample per page, with its size.
+    """
+    events = Event.objects.filter(pk__in=crowded_event_ids()).order_by('date_and_time')
+    if compact:
+        events, serializer_class = events.select_related('organizer', 'category'), EventListSerializer
+    else:
+        member_ids = CustomUser.objects.only('id')
+        events = events.select_related('organizer').prefetch_related(
+            Prefetch('attendees', queryset=member_ids), Prefetch('waitlist', queryset=member_ids),
+        )
+        serializer_class = EventSerializer
+    for _ in range(iterations):
+        run.call(lambda: JSONRenderer().render(serializer_class(events.all(), many=True).data))
+
+
+SEARCH_TERMS = ['Venue 42', 'Venue 7', 'Event 12345', 'Seeded', 'nothing-matches-this']
+
+
+def search_events(run, rng, iterations, backend=None):
+    """
+    Search the upcoming events for each of `SEARCH_TERMS` per iteration and load the
+    first page (COUNT + 10 rows), with `backend` or the configured search backend.
+    """
+    get_search_backend.cache_clear()
+    backend = backend or get_search_backend()
+
+    def first_page(term):
+        results = backend.search(Event.objects.filter(date_and_time__gte=timezone.now()), term)
+        results.count()
+        list(results[:10])
+
+    for _ in range(iterations):
+        for term in SEARCH_TERMS:
+            run.call(first_page, term)
+
+
+# In-flight requests of the concurrent read scenarios
+READ_CONCURRENCY = 64
+
+
+def concurrent_reads(run, rng, iterations, asynchronous):
+    """
+    50 requests per iteration to the event list, an event and its comments, up to
+    `READ_CONCURRENCY` at once: the sync endpoints from a thread pool, or the async
+    ones from one event loop (whose queries are not counted).
+    """
+    event_id = (
+        Event.objects.filter(date_and_time__gte=timezone.now()).order_by('date_and_time')
+        .values_list('pk', flat=True).first()
+    )
+    paths = ['events/', f'events/{event_id}/', f'events/{event_id}/comments/']
+    total = iterations * 50
+    if asynchronous:
+        async def read_all():
+            client, gate = AsyncClient(), asyncio.Semaphore(READ_CONCURRENCY)
+
+            async def read(i):
+                async with gate:
+                    await run.arequest(client, '/api/v1/async/' + paths[i % len(paths)])
+
+            await asyncio.gather(*(read(i) for i in range(total)))
+
+        asyncio.run(read_all())
+    else:
+        def read(i):
+            try:
+                run.get('/api/v1/' + paths[i % len(paths)], client=Client())
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=READ_CONCURRENCY) as pool:
+            list(pool.map(read, range(total)))
+
+
+@contextmanager
+def scratch_connection(settings_dict):
+    """Point this thread's default database connection at `settings_dict` for the enclosed block."""
+    previous = connections[DEFAULT_DB_ALIAS]
+    connections[DEFAULT_DB_ALIAS] = previous.__class__(settings_dict)
+    try:
+        yield
+    finally:
+        connections[DEFAULT_DB_ALIAS].close()
+        connections[DEFAULT_DB_ALIAS] = previous
+
+
+# Threads of the write contention scenarios
+CONTENTION_WRITERS = 8
+CONTENTION_READERS = 4
+
+
+def write_contention(run, rng, iterations, production):
+    """
+    `CONTENTION_WRITERS` threads toggle their registration for one event, ten times
+    per iteration each, while `CONTENTION_READERS` threads keep reading it, on a
+    scratch SQLite file with the default or the production database profile. Each
+    write is a sample: 'ok', or 'locked' when SQLite gave up waiting for the lock.
+    The seeded database is left alone (SQLite only).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        database = {
+            **connection.settings_dict, 'NAME': os.path.join(tmp, 'bench.sqlite3'),
+            'OPTIONS': dict(settings.SQLITE_PRODUCTION_OPTIONS if production else {}),
+        }
+
+        def prepare():
+            with scratch_connection(database):
+                call_command('migrate', verbosity=0)
+                organizer = CustomUser.objects.create_user('bench_organizer')
+                event = Event.objects.create(
+                    title='Rush', description='Benchmark', location='Here', organizer=organizer,
+                    capacity=CONTENTION_WRITERS, date_and_time=timezone.now() + timedelta(days=1),
+                )
+                users = CustomUser.objects.bulk_create(
+                    [CustomUser(username=f'bench_{i}', password='!') for i in range(CONTENTION_WRITERS)]
+                )
+                return event.pk, [user.pk for user in users]
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            event_id, user_ids = pool.submit(prepare).result()
+        # Bypass retry_on_busy so raw lock failures are counted
+        toggle = toggle_registration.__wrapped__
+        start = threading.Barrier(CONTENTION_WRITERS + CONTENTION_READERS)
+        done = threading.Event()
+
+        def write(user_id):
+            with scratch_connection(database):
+                start.wait()
+                for _ in range(iterations * 10):
+                    started = time.perf_counter()
+                    try:
+                        toggle(event_id, user_id)
+                        status = 'ok'
+                    except OperationalError as exc:
+                        if not is_busy_error(exc):
+                            raise
+                        status = 'locked'
+                    run.record((time.perf_counter() - started) * 1000, status)
+
+        def read():
+            with scratch_connection(database):
+                start.wait()
+                while not done.is_set():
+                    try:
+                        list(Event.objects.filter(pk=event_id).values('attendees_count'))
+                    except OperationalError:
+                        pass
+
+        writers = [threading.Thread(target=write, args=(user_id,)) for user_id in user_ids]
+        readers = [threading.Thread(target=read) for _ in range(CONTENTION_READERS)]
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+    # Migrating the scratch file cached its content type ids
+    ContentType.objects.clear_cache()
+
+
+SCENARIOS = {
+    'browse_events': browse_events,
+    'filter_events': filter_events,
+    'registration_rush': registration_rush,
+    'read_comments': read_comments,
+    'auth_jwt': partial(toggle_membership, authentication=JWTAuthentication),
+    'auth_token_user': partial(toggle_membership, authentication=TokenUserJWTAuthentication),
+    'ticket_rush_database': partial(crowded_rush, full_cache=False),
+    'ticket_rush_cached': crowded_rush,
+    'ticket_rush_throttled': crowded_rush,
+    'signup_individual': partial(festival_signup, batched=False),
+    'signup_batch': partial(festival_signup, batched=True),
+    'json_drf': partial(encode_json, renderer_class=JSONRenderer, parser_class=JSONParser),
+    'json_orjson': partial(encode_json, renderer_class=renderers.ORJSONRenderer, parser_class=renderers.ORJSONParser),
+    'list_full': partial(crowded_list_page, compact=False),
+    'list_compact': partial(crowded_list_page, compact=True),
+    'search_icontains': partial(search_events, backend=IContainsSearchBackend()),
+    'search_configured': search_events,
+    'reads_sync': partial(concurrent_reads, asynchronous=False),
+    'reads_async': partial(concurrent_reads, asynchronous=True),
+    'write_contention_default': partial(write_contention, production=False),
+    'write_contention_production': partial(write_contention, production=True),
+}
+
+# Scenarios that measure the response cache or the throttles, which the suite turns off by default
+NEEDS = {
+    'ticket_rush_database': {'cache'},
+    'ticket_rush_cached': {'cache'},
+    'ticket_rush_throttled': {'cache', 'throttles'},
+}
+
+
+def scenario_settings(name, cache=False, throttles=False):
+    """Settings overrides for one scenario: no response cache and no throttles unless wanted."""
+    needs = NEEDS.get(name, set())
+    overrides = {}
+    if not (cache or 'cache' in needs):
+        overrides['CACHES'] = NO_CACHE
+    if not (throttles or 'throttles' in needs):
+        overrides['REST_FRAMEWORK'] = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': NO_THROTTLES}
+    return overrides
+
+
+def run_scenario(name, iterations, seed=0, cache=False, throttles=False):
+    with override_settings(**scenario_settings(name, cache, throttles)):
+        # Throttle buckets and cached "event full" states would carry over between scenarios
+        get_cache().clear()
+        run = ScenarioRun()
+        started = time.perf_counter()
+        SCENARIOS[name](run, random.Random(seed), iterations)
+        return run.summary(time.perf_counter() - started)
+
+
+def compare(current, baseline):
+    """Yields (scenario, metric, baseline value, current value, change %) for shared scenarios."""
+    metrics = [
+        ('p50 ms', 'latency_ms', 'p50'),
+        ('p95 ms', 'latency_ms', 'p95'),
+        ('p99 ms', 'latency_ms', 'p99'),
+        ('req/s', 'throughput_rps', None),
+        ('queries/req', 'queries_per_request', 'mean'),
+        ('KiB/resp', 'response_kib', 'mean'),
+    ]
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not (before and before['requests'] and result['requests']):
+            continue
+        for label, group, key in metrics:
+            old, new = (summary.get(group) for summary in (before, result))
+            if key is not None:
+                old, new = (value and value.get(key) for value in (old, new))
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else None
+            yield name, label, old, new, change
@@ -0,0 +1,139 @@
+"""
+Bulk event import (JSON Lines / CSV) and streaming export.
+
+Import bodies are parsed lazily, one line at a time, validated with
+EventSerializer and written with bulk_create one chunk per transaction, so a
+season of events costs one INSERT per chunk instead of one request per event.
+Export walks the table with ``.iterator()`` and yields one line per event.
+"""
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework.parsers import BaseParser
+
+from .discovery import adjust_day_buckets, bucket_deltas
+from .geo import grid_cell
+from .models import Event
+from .serializers import EventSerializer
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'date_and_time', 'location', 'capacity',
+    'category_id', 'latitude', 'longitude', 'organizer_id', 'attendees_count', 'waitlist_count', 'created_date',
+)
+
+
+class RowError(dict):
+    """Placeholder yielded for a line that could not be decoded at all."""
+
+
+# --- Parsers (return lazy row iterators instead of a parsed body) ---
+
+class JSONLinesParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if stream is None:
+            return iter(())
+        return self._rows(codecs.iterdecode(stream, encoding))
+
+    @staticmethod
+    def _rows(lines):
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                yield RowError(non_field_errors=[f"Invalid JSON: {exc}"])
+
+
+class JSONLParser(JSONLinesParser):
+    media_type = 'application/jsonl'
+
+
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if stream is None:
+            return iter(())
+        rows = csv.DictReader(codecs.iterdecode(stream, encoding))
+        # CSV has no null; an empty cell means "no value" (e.g. no category)
+        return ({key: (value if value != '' else None) for key, value in row.items()} for row in rows)
+
+
+# --- Import ---
+
+def import_events(rows, organizer, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate and insert `rows` (an iterable of dicts) as events organised by
+    `organizer`. Returns (created_count, errors) where each error names its row.
+    """
+    created = 0
+    errors = []
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            break
+        events = []
+        for row_number, row in chunk:
+            if isinstance(row, RowError):
+                row_errors = dict(row)
+            elif not isinstance(row, dict):
+                row_errors = {'non_field_errors': ["Expected an object."]}
+            else:
+                serializer = EventSerializer(data=row)
+                if serializer.is_valid():
+                    event = Event(organizer=organizer, **serializer.validated_data)
+                    # bulk_create skips Event.save(), which normally sets the grid cell
+                    event.geo_cell = grid_cell(event.latitude, event.longitude)
+                    events.append(event)
+                    continue
+                row_errors = serializer.errors
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': row_number, 'errors': row_errors})
+        if events:
+            with transaction.atomic():
+                Event.objects.bulk_create(events)
+                # ...and the post_save signal that counts it into its day bucket
+                adjust_day_buckets(bucket_deltas(events))
+            created += len(events)
+    return created, errors
+
+
+# --- Export ---
+
+def export_rows():
+    """Every event as a flat dict, fetched in chunks without building model instances."""
+    return Event.objects.order_by('pk').values(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def export_jsonl():
+    for row in export_rows():
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_csv():
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for row in export_rows():
+        writer.writerow(row)
+        # Hand each line to the response as soon as it is written
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
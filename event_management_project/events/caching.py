@@ -0,0 +1,211 @@
+"""
+Response cache for the public (AllowAny) read endpoints.
+
+Cached entries are addressed by version counters rather than deleted: writes bump
+the counter for what they touched, so every key built from the old version simply
+stops being read and ages out. Versions kept:
+
+* ``events:list``          - any event change (affects every list page)
+* ``events:<pk>``          - one event's detail representation
+* ``events:<pk>:comments`` - one event's comment list
+* ``users:<pk>:events``    - one user's "my events" dashboard
+* ``events:<pk>:fields``   - one event's own fields, checked by every dashboard listing it
+* ``events:<pk>:seats``    - seats freed on one event (outdates its "event full" flag)
+
+Configure the backend with Django's ``CACHES`` (``EVENT_CACHE_ALIAS``) and the
+entry lifetime with ``EVENT_CACHE_TIMEOUT``.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import status
+from rest_framework.response import Response
+
+LIST_VERSION = 'events:list'
+
+
+def get_cache():
+    return caches[getattr(settings, 'EVENT_CACHE_ALIAS', 'default')]
+
+
+def event_version_key(event_id):
+    return f'events:{event_id}'
+
+
+def comments_version_key(event_id):
+    return f'events:{event_id}:comments'
+
+
+def user_events_version_key(user_id):
+    return f'users:{user_id}:events'
+
+
+def event_fields_version_key(event_id):
+    return f'events:{event_id}:fields'
+
+
+def seats_version_key(event_id):
+    return f'events:{event_id}:seats'
+
+
+def _fresh_version():
+    # Time-based so a version evicted from the cache never restarts at a value already used
+    return time.time_ns()
+
+
+def get_versions(*names):
+    """Current value of each version counter, creating missing ones."""
+    cache = get_cache()
+    versions = cache.get_many(names)
+    for name in names:
+        if name not in versions:
+            cache.add(name, _fresh_version(), None)
+            versions[name] = cache.get(name)
+    return [versions[name] for name in names]
+
+
+def bump(*names):
+    cache = get_cache()
+    for name in names:
+        try:
+            cache.incr(name)
+        except ValueError:
+            cache.set(name, _fresh_version(), None)
+
+
+# --- Invalidation hooks ---
+
+def invalidate_event_list():
+    """Events were added in bulk; no existing detail entry is affected."""
+    bump(LIST_VERSION)
+
+
+def invalidate_event(event_id):
+    """An event's own fields, attendees or waitlist changed."""
+    bump(LIST_VERSION, event_version_key(event_id))
+
+
+def invalidate_comments(event_id):
+    """A comment was written; the event's rating aggregates may have changed too."""
+    bump(LIST_VERSION, event_version_key(event_id), comments_version_key(event_id))
+
+
+def invalidate_event_fields(event_id):
+    """An event was edited or deleted; dashboards listing it see that through its fields version."""
+    bump(LIST_VERSION, event_version_key(event_id), event_fields_version_key(event_id))
+
+
+def fields_versions(events):
+    """Fields versions of serialised `events`, stored with a dashboard page to tell when it is stale."""
+    return get_versions(*(event_fields_version_key(event['id']) for event in events))
+
+
+def invalidate_user_events(*user_ids):
+    """The users joined or left an event or its waitlist, or an event they belong to changed."""
+    bump(*(user_events_version_key(user_id) for user_id in user_ids))
+
+
+def invalidate_seats(event_id):
+    """An attendee left or the capacity changed, so a cached "event full" state is stale."""
+    bump(seats_version_key(event_id))
+
+
+# --- "Event full" state ---
+#
+# When a registration is turned away, a "full" flag is cached under the seats version
+# read *before* the database said "full". While that version is current no seat can
+# have been freed, so a user who is not an attendee (one indexed lookup) is turned away
+# without locking the event. Attendees still reach the database, since for them
+# `register` means unregister.
+
+def full_state_key(event_id, version):
+    return f'events:{event_id}:full:{version}'
+
+
+def seats_version(event_id):
+    (version,) = get_versions(seats_version_key(event_id))
+    return version
+
+
+def remember_full(event_id, version):
+    timeout = getattr(settings, 'EVENT_FULL_CACHE_TIMEOUT', 30)
+    if timeout:
+        get_cache().set(full_state_key(event_id, version), True, timeout)
+
+
+def is_known_full(event_id, version):
+    """True if the event was full when the seats were at `version`."""
+    return get_cache().get(full_state_key(event_id, version), False)
+
+
+# --- Response caching ---
+
+def params_digest(request):
+    """Stable digest of the query string, so each filter set/page gets its own entry."""
+    items = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    return hashlib.md5(json.dumps(items).encode()).hexdigest()
+
+
+def compute_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return '"%s"' % hashlib.sha1(payload).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def cached_response(request, key, build, stamp=None):
+    """
+    Serve `key` from the cache, or call `build()` (which returns a DRF Response)
+    and store its data. Honours If-None-Match with a bare 304. `stamp(data)`, if
+    given, is stored with the entry and recomputed on each hit; a changed stamp
+    means the entry is rebuilt.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None and stamp is not None and stamp(entry[1]) != entry[-1]:
+        entry = None
+    if entry is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        entry = (compute_etag(response.data), response.data, stamp and stamp(response.data))
+        cache.set(key, entry, getattr(settings, 'EVENT_CACHE_TIMEOUT', 300))
+    else:
+        response = None
+
+    etag, data = entry[:2]
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    elif response is None:
+        response = Response(data)
+    response['ETag'] = etag
+    return response
+
+
+class CachedReadMixin:
+    """
+    ViewSet mixin that serves `list` and `retrieve` through `cached_response`.
+    Subclasses return the cache key (or None to bypass) from `get_cache_key`.
+    """
+
+    def get_cache_key(self, request):
+        raise NotImplementedError
+
+    def _cached(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        return cached_response(request, key, lambda: handler(request, *args, **kwargs))
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,67 @@
+"""
+Process-level cache of the (small, rarely changing) categories table.
+
+Filters, the calendar and event writes look categories up by name or id. Going
+through ``category_cache`` turns those lookups into dict reads instead of a
+query or a ``category__name`` join per request.
+
+Saving or deleting a category bumps the ``categories`` version in the event
+cache (see ``caching``). Each process compares its copy with that version on
+use and reloads the whole table (one query) when it has moved, so with a
+shared cache backend every worker sees a change on its next request. Without
+a version to compare (e.g. under DummyCache) every use reloads. Code making
+many lookups takes one ``snapshot()`` so the version is read only once.
+"""
+import threading
+
+from .caching import bump, get_versions
+from .models import Category
+
+CATEGORIES_VERSION = 'categories'
+
+
+class CategoryCache:
+    """name -> id and id -> name maps of every category, reloaded when the version changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = {}
+        self._names = {}
+
+    def snapshot(self):
+        """(name -> id, id -> name) maps, current as of this call."""
+        (version,) = get_versions(CATEGORIES_VERSION)
+        with self._lock:
+            # None: no shared version to compare against, so the copy cannot be trusted
+            if version is None or version != self._version:
+                rows = list(Category.objects.values_list('id', 'name'))
+                self._ids = {name: pk for pk, name in rows}
+                self._names = dict(rows)
+                self._version = version
+            return self._ids, self._names
+
+    def id_for(self, name):
+        """The id of the category called `name`, or None."""
+        return self.snapshot()[0].get(name)
+
+    def name_for(self, category_id):
+        """The name of the category with this id, or None."""
+        return self.snapshot()[1].get(category_id)
+
+    def items(self):
+        """[(id, name)] of every category, by name."""
+        return sorted(self.snapshot()[1].items(), key=lambda item: item[1])
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+
+
+category_cache = CategoryCache()
+
+
+def invalidate_categories():
+    """A category was added, renamed or deleted."""
+    bump(CATEGORIES_VERSION)
+    category_cache.clear()
@@ -0,0 +1,63 @@
+"""Database helpers for running on SQLite under concurrent workers."""
+import functools
+import random
+import time
+
+from django.db import OperationalError, connections, router
+
+# --- Busy Retry ---
+
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05  # seconds, doubled after every attempt
+
+
+def is_busy_error(exc):
+    message = str(exc).lower()
+    # "database table is locked" is SQLITE_LOCKED, which shared-cache (e.g. in-memory test) databases raise
+    return any(text in message for text in ('database is locked', 'database is busy', 'database table is locked'))
+
+
+def retry_on_busy(func):
+    """
+    Retry a write transaction that failed with SQLITE_BUSY, with jittered backoff.
+    Only the outermost transaction is retried: inside an enclosing atomic block
+    the error is re-raised, since the caller's earlier work is already lost.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        connection = connections[router.db_for_write(None)]
+        delay = BUSY_BACKOFF
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == BUSY_RETRIES or connection.in_atomic_block or not is_busy_error(exc):
+                    raise
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay *= 2
+    return wrapper
+
+# --- Read-only Routing ---
+
+class ReadOnlyReplicaRouter:
+    """
+    Sends reads to the 'readonly' alias (a mode=ro connection to the same SQLite
+    file) unless a write transaction is open, so a transaction always reads its
+    own uncommitted changes.
+    """
+    read_alias = 'readonly'
+    write_alias = 'default'
+
+    def db_for_read(self, model, **hints):
+        if connections[self.write_alias].in_atomic_block:
+            return self.write_alias
+        return self.read_alias
+
+    def db_for_write(self, model, **hints):
+        return self.write_alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.write_alias
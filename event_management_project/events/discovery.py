@@ -0,0 +1,111 @@
+"""
+Calendar discovery: per-day and per-category event counts for a month.
+
+Counts come from ``EventDayBucket``, one row per (day, category). Signals keep
+the rows current as events are saved and deleted, and bulk writers apply their
+deltas directly, so a month window reads at most ~31 x categories small rows
+instead of counting events. ``rebuild_day_buckets`` recomputes the table from
+scratch (run by ``rebuild_event_counters``).
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .categories import category_cache
+from .models import Event, EventDayBucket
+
+
+def bucket_day(moment):
+    """The calendar day an event falls on, in the project time zone."""
+    return timezone.localtime(moment, timezone.get_default_timezone()).date()
+
+
+def adjust_day_buckets(deltas):
+    """Apply {(day, category_id): change} to the bucket counts, creating missing buckets."""
+    for (day, category_id), delta in deltas.items():
+        if not delta:
+            continue
+        buckets = EventDayBucket.objects.filter(day=day, category_id=category_id)
+        if buckets.update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                EventDayBucket.objects.create(day=day, category_id=category_id, count=delta)
+        except IntegrityError:
+            # Another writer created the bucket first; add to it instead
+            buckets.update(count=F('count') + delta)
+
+
+def bucket_deltas(events, sign=1):
+    """{(day, category_id): count} for an iterable of events, ready for adjust_day_buckets."""
+    deltas = defaultdict(int)
+    for event in events:
+        deltas[bucket_day(event.date_and_time), event.category_id] += sign
+    return deltas
+
+
+def rebuild_day_buckets():
+    """Recompute every bucket from the events table; returns the number of buckets."""
+    rows = (
+        Event.objects.order_by()
+        .annotate(day=TruncDate('date_and_time', tzinfo=timezone.get_default_timezone()))
+        .values('day', 'category_id')
+        .annotate(total=Count('id'))
+    )
+    with transaction.atomic():
+        EventDayBucket.objects.all().delete()
+        buckets = EventDayBucket.objects.bulk_create(
+            [EventDayBucket(day=row['day'], category_id=row['category_id'], count=row['total'])
+             for row in rows.iterator()],
+            batch_size=1000,
+        )
+    return len(buckets)
+
+# --- Month summary ---
+
+def parse_month(value):
+    """First day of the month named by 'YYYY-MM' (the current month if empty); raises ValueError."""
+    if not value:
+        return timezone.localdate(timezone=timezone.get_default_timezone()).replace(day=1)
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
+
+
+def month_counts(first_day, category=None):
+    """Event counts for the month starting at `first_day`, per day and per category."""
+    last_day = first_day.replace(day=calendar.monthrange(first_day.year, first_day.month)[1])
+    buckets = EventDayBucket.objects.filter(day__range=(first_day, last_day), count__gt=0)
+    # One version check for the whole month, not one per bucket
+    category_ids, category_names = category_cache.snapshot()
+    if category:
+        category_id = category_ids.get(category)
+        buckets = buckets.filter(category_id=category_id) if category_id is not None else buckets.none()
+
+    days = defaultdict(dict)
+    totals = defaultdict(int)
+    rows = [
+        (day, category_names.get(category_id), count)
+        for day, category_id, count in buckets.values_list('day', 'category_id', 'count')
+    ]
+    # By day, then name with uncategorised (None) first, as ordering by category__name did
+    for day, name, count in sorted(rows, key=lambda row: (row[0], row[1] is not None, row[1] or '')):
+        days[day][name] = count
+        totals[name] += count
+
+    def as_list(counts):
+        return [{'category': name, 'count': count} for name, count in counts.items()]
+
+    return {
+        'month': first_day.strftime('%Y-%m'),
+        'total': sum(totals.values()),
+        'categories': as_list(totals),
+        'days': [
+            {'date': day, 'count': sum(counts.values()), 'categories': as_list(counts)}
+            for day, counts in days.items()
+        ],
+    }
@@ -0,0 +1,99 @@
+"""
+Incremental comment feed for live events.
+
+``?since_id=`` on the comment list returns only comments newer than the last
+one a client has seen, with an index seek on ``(event, id)``. The async
+``comments/stream/`` endpoint pushes the same rows as Server-Sent Events.
+Each open stream checks the event's comments version in the cache every
+``COMMENT_STREAM_POLL_SECONDS``, and queries only when a comment was written.
+The fetched page is cached under that version, so viewers at the same
+position share a single query.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .caching import comments_version_key, get_cache, get_versions
+from .models import Comment
+from .serializers import CommentSerializer
+
+FEED_LIMIT = 100
+
+
+def comments_after(event_id, since_id=None, since=None):
+    """An event's comments after id `since_id` (or created after `since`), oldest first."""
+    comments = Comment.objects.filter(event_id=event_id).select_related('user')
+    if since_id is not None:
+        return comments.filter(id__gt=since_id).order_by('id')
+    return comments.filter(created_at__gt=since).order_by('created_at', 'id')
+
+
+def feed_page(comments, since_id=None, limit=FEED_LIMIT):
+    """Feed response body for up to `limit` comments; `last_id` is what to send as the next since_id."""
+    rows = list(comments[:limit + 1])
+    return feed_body(rows, since_id, limit)
+
+
+def feed_body(rows, since_id, limit):
+    page = rows[:limit]
+    return {
+        'results': CommentSerializer(page, many=True).data,
+        'last_id': page[-1].pk if page else since_id,
+        'has_more': len(rows) > limit,
+    }
+
+# --- Server-Sent Events ---
+
+def sse_message(comment):
+    data = json.dumps(comment, cls=DjangoJSONEncoder)
+    return f"id: {comment['id']}\nevent: comment\ndata: {data}\n\n"
+
+
+async def _new_comments(event_id, version, since_id):
+    """The next page of comments after `since_id`, shared by every stream at that position."""
+    cache = get_cache()
+    key = f'events:comments:stream:{event_id}:{version}:{since_id}'
+    body = await cache.aget(key)
+    if body is None:
+        rows = [row async for row in comments_after(event_id, since_id=since_id)[:FEED_LIMIT + 1]]
+        body = feed_body(rows, since_id, FEED_LIMIT)
+        await cache.aset(key, body, getattr(settings, 'EVENT_CACHE_TIMEOUT', 300))
+    return body
+
+
+async def comment_events(event_id, since_id):
+    """
+    Yield SSE messages for comments written after `since_id`, as they arrive.
+    Ends after COMMENT_STREAM_MAX_SECONDS; EventSource then reconnects with the
+    Last-Event-ID header and resumes where it stopped.
+    """
+    poll = getattr(settings, 'COMMENT_STREAM_POLL_SECONDS', 1)
+    heartbeat = getattr(settings, 'COMMENT_STREAM_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + getattr(settings, 'COMMENT_STREAM_MAX_SECONDS', 300)
+    # Tell EventSource how long to wait before reconnecting (ms)
+    yield f'retry: {int(poll * 1000)}\n\n'
+    seen_version, last_sent = object(), time.monotonic()
+    while time.monotonic() < deadline:
+        version = await get_cache().aget(comments_version_key(event_id))
+        if version is None:
+            # No comment written since the version was evicted (or ever); start a new one
+            (version,) = await sync_to_async(get_versions)(comments_version_key(event_id))
+        if version != seen_version:
+            body = await _new_comments(event_id, version, since_id)
+            for comment in body['results']:
+                yield sse_message(comment)
+            since_id = body['last_id']
+            # With more pending, read the next page straight away
+            if not body['has_more']:
+                seen_version = version
+            last_sent = time.monotonic()
+            continue
+        if time.monotonic() - last_sent >= heartbeat:
+            # Comment line: keeps proxies from closing an idle connection
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        await asyncio.sleep(poll)
@@ -1,20 +1,112 @@
 import django_filters
-from .models import Event, Category
+from django import forms
+from rest_framework.filters import OrderingFilter
+from .categories import category_cache
+from .geo import DEFAULT_RADIUS_KM, MAX_RADIUS_KM, within_radius
+from .models import Event
+from .search import get_search_backend
+
+
+class PointField(forms.CharField):
+    """'latitude,longitude' -> (latitude, longitude)."""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        try:
+            latitude, longitude = (float(part) for part in value.split(','))
+        except ValueError:
+            raise forms.ValidationError("Enter a point as 'latitude,longitude'.")
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise forms.ValidationError("Latitude must be within ±90 and longitude within ±180.")
+        return latitude, longitude
+
+
+class PointFilter(django_filters.Filter):
+    field_class = PointField
+
+
+class CategoryNameField(forms.CharField):
+    """Category name -> category id, resolved through the category cache."""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        category_id = category_cache.id_for(value)
+        if category_id is None:
+            raise forms.ValidationError(
+                "Select a valid choice. That choice is not one of the available choices.", code='invalid_choice'
+            )
+        return category_id
+
+
+class CategoryFilter(django_filters.Filter):
+    field_class = CategoryNameField
+
 
 class EventFilter(django_filters.FilterSet):
+    # Ranked full-text search over title, description and location
+    q = django_filters.CharFilter(method='search', label='Search')
     # Search/Filter by Title and Location (Case-insensitive contains)
     title = django_filters.CharFilter(lookup_expr='icontains')
     location = django_filters.CharFilter(lookup_expr='icontains')
-    category = django_filters.ModelChoiceFilter(
-        queryset=Category.objects.all(),
-        field_name='category__name',
-        to_field_name='name',
-        lookup_expr='exact'
-    )
+    # Filter by category name, applied as category_id (no join on the categories table)
+    category = CategoryFilter(field_name='category_id', lookup_expr='exact')
     # Filter by Date Range (Stretch Goal)
     date_range_start = django_filters.DateTimeFilter(field_name='date_and_time', lookup_expr='gte')
     date_range_end = django_filters.DateTimeFilter(field_name='date_and_time', lookup_expr='lte')
+    # "Near me": events within radius_km (default 10) of near=<latitude>,<longitude>
+    near = PointFilter(method='filter_near', label='Near (latitude,longitude)')
+    radius_km = django_filters.NumberFilter(
+        method='filter_radius', label='Radius (km)', min_value=0, max_value=MAX_RADIUS_KM
+    )
 
     class Meta:
         model = Event
-        fields = ['title', 'location', 'category', 'date_and_time']
\ No newline at end of file
+        fields = ['title', 'location', 'category', 'date_and_time']
+
+    def search(self, queryset, name, value):
+        return get_search_backend().search(queryset, value)
+
+    def filter_near(self, queryset, name, value):
+        latitude, longitude = value
+        radius = self.form.cleaned_data.get('radius_km')
+        if radius is None:
+            radius = DEFAULT_RADIUS_KM
+        return within_radius(queryset, latitude, longitude, float(radius))
+
+    def filter_radius(self, queryset, name, value):
+        # Only meaningful together with `near`, which reads it
+        return queryset
+
+
+class EventOrderingFilter(OrderingFilter):
+    """
+    `?ordering=` for events; `rating` is an alias for the precomputed `rating_average`
+    (so `?ordering=-rating` lists the best rated first). `id` is appended as a
+    tiebreaker, so pages over equal values neither repeat nor skip rows. Without the
+    parameter the queryset order (soonest first, or search rank) is left untouched.
+    """
+    aliases = {'rating': 'rating_average'}
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            fields = []
+            for term in params.split(','):
+                term = term.strip()
+                prefix = '-' if term.startswith('-') else ''
+                fields.append(prefix + self.aliases.get(term.lstrip('-'), term.lstrip('-')))
+            ordering = self.remove_invalid_fields(queryset, fields, view, request)
+            if ordering:
+                if not {'id', '-id'} & set(ordering):
+                    ordering.append('id')
+                return ordering
+        return self.get_default_ordering(view)
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,90 @@
+"""
+Grid index for "near me" event queries.
+
+The globe is cut into square cells of ``GRID_DEGREES`` on a side. Each event
+stores the number of the cell holding its coordinates in ``Event.geo_cell``,
+which is indexed together with ``date_and_time``. Cells are numbered row by row,
+so within one row of the grid a stretch of longitude is a contiguous range of
+cell numbers. A radius query therefore becomes one ``geo_cell BETWEEN`` range
+per grid row of its bounding box, and the database reads only index entries
+inside the box. The exact great-circle distance is then checked on those rows.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+GRID_DEGREES = 0.1
+ROWS = round(180 / GRID_DEGREES)
+COLUMNS = round(360 / GRID_DEGREES)
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+
+
+def _row(latitude):
+    return min(ROWS - 1, max(0, math.floor((latitude + 90) / GRID_DEGREES)))
+
+
+def _column(longitude):
+    # Modulo wraps longitudes past the antimeridian back into range
+    return math.floor((longitude + 180) / GRID_DEGREES) % COLUMNS
+
+
+def grid_cell(latitude, longitude):
+    """Cell number for a point, or None when either coordinate is missing."""
+    if latitude is None or longitude is None:
+        return None
+    return _row(latitude) * COLUMNS + _column(longitude)
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """Inclusive (first, last) cell ranges covering the bounding box of a circle."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(-90.0, latitude - lat_delta), min(90.0, latitude + lat_delta)
+    # A degree of longitude shrinks towards the poles; near one the box spans every longitude
+    widest = max(abs(south), abs(north))
+    cos_widest = math.cos(math.radians(widest))
+    lng_delta = 180.0 if cos_widest < 1e-9 else math.degrees(radius_km / (EARTH_RADIUS_KM * cos_widest))
+    if lng_delta >= 180:
+        spans = [(0, COLUMNS - 1)]
+    else:
+        west, east = _column(longitude - lng_delta), _column(longitude + lng_delta)
+        spans = [(west, east)] if west <= east else [(west, COLUMNS - 1), (0, east)]
+
+    ranges = []
+    for row in range(_row(south), _row(north) + 1):
+        for first, last in spans:
+            first, last = row * COLUMNS + first, row * COLUMNS + last
+            if ranges and ranges[-1][1] + 1 == first:
+                # Full-width rows run into each other; one range is enough
+                ranges[-1] = (ranges[-1][0], last)
+            else:
+                ranges.append((first, last))
+    return ranges
+
+
+def distance_km(latitude, longitude):
+    """Haversine distance in km from the given point to each row's coordinates."""
+    lat = math.radians(latitude)
+    row_lat = Radians(F('latitude'))
+    half_dlat = (row_lat - Value(lat)) / 2
+    half_dlng = (Radians(F('longitude')) - Value(math.radians(longitude))) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat)) * Cos(row_lat) * Power(Sin(half_dlng), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """Events within `radius_km` of the point, annotated with `distance_km`."""
+    cells = Q()
+    for first, last in cell_ranges(latitude, longitude, radius_km):
+        cells |= Q(geo_cell__range=(first, last))
+    # As a subquery the candidates always come from the geo_cell index; filtered inline,
+    # SQLite prefers walking the date index and checking cells row by row, which scans
+    # every upcoming event when the area holds few of them.
+    candidates = queryset.model.objects.filter(cells).values('pk')
+    return (
+        queryset.filter(pk__in=candidates)
+        .annotate(distance_km=distance_km(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+    )
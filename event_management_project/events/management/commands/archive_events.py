@@ -0,0 +1,38 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from events.archive import ARCHIVE_BATCH_SIZE, ARCHIVE_CHUNK_SIZE, archive_cutoff, archive_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Move events that finished more than --older-than-days ago, with their attendees, waitlist "
+        "and comments, into the archive tables. Runs in short batches; safe to schedule (e.g. nightly "
+        "from cron) and to interrupt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help="Events archived per batch.")
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE,
+                            help="Related rows moved per transaction.")
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Seconds to sleep between transactions, leaving room for other writers.")
+        parser.add_argument('--limit', type=int, help="Stop after archiving this many events.")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['older_than_days'])
+        totals = Counter()
+        for moved in archive_events(cutoff, batch_size=options['batch_size'], chunk_size=options['chunk_size'],
+                                    pause=options['pause'], limit=options['limit']):
+            totals.update(moved)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  archived {moved['events']} events ({totals['events']} so far)")
+        self.stdout.write(self.style.SUCCESS(
+            "Archived {events} events before {cutoff:%Y-%m-%d}: {attendees} attendees, {waitlist} waitlist "
+            "entries, {comments} comments.".format(cutoff=cutoff, **{
+                key: totals[key] for key in ('events', 'attendees', 'waitlist', 'comments')
+            })
+        ))
@@ -0,0 +1,111 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from events.benchmarks import SCENARIOS, compare, run_scenario
+from events.seeding import throwaway_database
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the benchmark scenarios in-process on one seeded throwaway database: API traffic "
+        "(browsing, filtering, registration rushes, comment reading) and paired comparisons "
+        "(authentication, sign-ups, JSON encoding, list representations, search, sync/async "
+        "reads, SQLite write contention). Reports p50/p95/p99 latency, throughput, queries per "
+        "request and response size; --output saves the results as JSON and --compare diffs them "
+        "against an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help="Run only this scenario (repeatable). Default: all.")
+        parser.add_argument('--iterations', type=int, default=20, help="Repetitions per scenario.")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=50_000)
+        parser.add_argument('--attendees', type=int, default=50_000)
+        parser.add_argument('--skew', type=float, default=1.0, help="Zipf exponent for popularity (0 = uniform).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cache', action='store_true', help="Keep the response cache enabled.")
+        parser.add_argument('--throttles', action='store_true', help="Keep the registration throttles enabled.")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reuse an existing seeded test database instead of rebuilding it.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="JSON results of an earlier run to compare against.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        dataset = {key: options[key] for key in ('users', 'events', 'comments', 'attendees', 'skew', 'seed')}
+        results = {
+            'meta': {
+                'commit': current_commit(),
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': options['cache'],
+                'throttles': options['throttles'],
+                'iterations': options['iterations'],
+                'dataset': dataset,
+            },
+            'scenarios': {},
+        }
+        self.stdout.write("Seeding %(users)s users, %(events)s events, %(comments)s comments..." % dataset)
+        with throwaway_database(keepdb=options['keepdb'], **dataset):
+            for name in options['scenario'] or SCENARIOS:
+                result = run_scenario(name, options['iterations'], seed=options['seed'],
+                                      cache=options['cache'], throttles=options['throttles'])
+                results['scenarios'][name] = result
+                self.report(name, result)
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self.report_comparison(results, baseline)
+
+    def report(self, name, result):
+        if not result['requests']:
+            self.stdout.write(f"{name:<28} no requests")
+            return
+        latency = result['latency_ms']
+        queries = result.get('queries_per_request')
+        queries = f"{queries['mean']:5.1f} queries/req (max {queries['max']})" if queries else f"{'':26}"
+        size = result.get('response_kib')
+        size = f"{size['mean']:9.1f} KiB/resp" if size else f"{'':18}"
+        statuses = f"   statuses {result['statuses']}" if result['statuses'] else ''
+        self.stdout.write(
+            f"{name:<28} {result['requests']:6d} req  {result['throughput_rps']:9.1f} req/s   "
+            f"p50 {latency['p50']:8.3f}  p95 {latency['p95']:8.3f}  p99 {latency['p99']:8.3f} ms   "
+            f"{queries}  {size}{statuses}"
+        )
+
+    def report_comparison(self, results, baseline):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Compared with {baseline.get('meta', {}).get('commit') or 'baseline'}:"
+        ))
+        for name, label, old, new, change in compare(results, baseline):
+            delta = f"{change:+6.1f}%" if change is not None else "    n/a"
+            self.stdout.write(f"  {name:<28} {label:<12} {old:>10} -> {new:<10} {delta}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from events.query_plans import endpoint_plans
+from events.seeding import throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database, call each read endpoint and EXPLAIN every SELECT it "
+        "issues. Fails if a hot table is read with a full scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=200_000)
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reuse an existing seeded test database instead of rebuilding it.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Preparing a test database with %(events)s events..." % options)
+        with throwaway_database(keepdb=options['keepdb'], users=options['users'],
+                                events=options['events'], comments=options['comments']):
+            failures = self.check_endpoints()
+
+        if failures:
+            raise CommandError(f"{failures} quer{'y' if failures == 1 else 'ies'} fell back to a full table scan.")
+        self.stdout.write(self.style.SUCCESS("All endpoint queries use an index."))
+
+    def check_endpoints(self):
+        failures = 0
+        for label, url, response, plans in endpoint_plans(Client()):
+            if response.status_code != 200:
+                raise CommandError(f"{label}: GET {url} returned {response.status_code}")
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label}  ({url}, {len(plans)} queries)"))
+            for sql, plan, scans in plans:
+                failures += len(scans)
+                self.stdout.write(f"  {sql[:160]}")
+                for line in plan:
+                    style = self.style.ERROR if line in scans else str
+                    self.stdout.write(style(f"    {line}"))
+        return failures
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from events.discovery import rebuild_day_buckets
+from events.models import Event
+from events.signals import refresh_counters, refresh_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Event.attendees_count and Event.waitlist_count from the M2M tables, the rating "
+        "aggregates from the comments, and the calendar's daily event buckets from the events table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of events recounted per UPDATE statement.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated, last_pk = 0, 0
+        while True:
+            # Walk the table by primary key so memory stays flat on large catalogues
+            ids = list(
+                Event.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += refresh_counters(ids)
+            refresh_ratings(ids)
+            last_pk = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters and ratings for {updated} events."))
+        buckets = rebuild_day_buckets()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} daily event buckets."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from events.search import install_sqlite_fts
+
+
+class Command(BaseCommand):
+    help = "Recreate the SQLite FTS5 event search table and triggers, then re-index every event."
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write("Nothing to do: the search index is only managed here on SQLite.")
+            return
+        with connection.schema_editor() as schema_editor:
+            install_sqlite_fts(schema_editor)
+        self.stdout.write(self.style.SUCCESS("Event search index rebuilt."))
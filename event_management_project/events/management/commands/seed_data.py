@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from events.caching import invalidate_event_list
+from events.models import Event
+from events.seeding import seed_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic users, events, comments, attendees and waitlist "
+        "entries for local testing at production scale. Popularity is skewed (hot events, heavy "
+        "commenters) and the same --seed always produces the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--events', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=2_000_000)
+        parser.add_argument('--attendees', type=int, default=5_000_000,
+                            help="Attendances to attempt; events never go past capacity.")
+        parser.add_argument('--waitlist', type=int, default=500_000,
+                            help="Waitlist entries to attempt, queued behind events that are full.")
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help="Zipf exponent of event popularity; 0 spreads comments and attendees evenly.")
+        parser.add_argument('--commenter-skew', type=float, default=1.0,
+                            help="Zipf exponent of how many comments each user writes.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows inserted per transaction.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--password',
+                            help="Password for every seeded user (seed_user_<n>); by default they cannot log in.")
+        parser.add_argument('--append', action='store_true',
+                            help="Seed even if the database already holds events.")
+
+    def handle(self, *args, **options):
+        if Event.objects.exists() and not options['append']:
+            raise CommandError(
+                "The database already holds events. Run `manage.py flush` first, or pass --append "
+                "(the new rows are then not the same as on an empty database)."
+            )
+        if connection.vendor == 'sqlite':
+            # Keep the indexes being filled in memory; SQLite's default page cache is only 2 MiB
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size=-262144')  # 256 MiB, this connection only
+        started = time.perf_counter()
+        counts = seed_database(
+            users=options['users'], events=options['events'], comments=options['comments'],
+            attendees=options['attendees'], waitlist=options['waitlist'], skew=options['skew'],
+            commenter_skew=options['commenter_skew'], batch_size=options['batch_size'],
+            seed=options['seed'], password=options['password'],
+        )
+        # Give the planner statistics for the new row counts
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        # Cached event pages predate the new rows
+        invalidate_event_list()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded {users} users, {events} events, {comments} comments, {attendees} attendees and "
+            "{waitlist} waitlist entries in {elapsed:.1f}s ({rate:,.0f} rows/s).".format(
+                elapsed=elapsed, rate=sum(counts.values()) / elapsed, **counts
+            )
+        ))
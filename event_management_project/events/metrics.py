@@ -0,0 +1,254 @@
+"""
+Per-endpoint request metrics (switched on with ``REQUEST_METRICS_ENABLED``).
+
+RequestMetricsMiddleware times each request. It counts the request's ORM
+queries and sums their SQL time through ``connection.execute_wrapper``, times
+the serializers turning objects into response data (``TimedSerializerMixin``
+reports to a per-request stopwatch held in a context variable), and times
+response rendering, i.e. encoding that data as JSON. The numbers go into
+in-process histograms labelled by DRF view and action, e.g.
+``EventViewSet.register``. ``/api/v1/_metrics`` (staff only) serves them in the
+Prometheus text format.
+
+A request that runs the same SQL shape more than
+``REQUEST_METRICS_N_PLUS_ONE_THRESHOLD`` times is logged as a likely N+1 and
+counted in ``api_n_plus_one_total``. Histograms are per process, so scrape
+every worker. Queries issued while a streaming response is consumed are not
+counted.
+"""
+import bisect
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'api_request_duration_seconds': ("Wall time per request.", DURATION_BUCKETS),
+    'api_request_sql_seconds': ("Time spent executing SQL per request.", DURATION_BUCKETS),
+    'api_request_serializer_seconds': ("Time spent in serializers producing the response data.", DURATION_BUCKETS),
+    'api_request_render_seconds': ("Time spent rendering (encoding) the response body.", DURATION_BUCKETS),
+    'api_request_queries': ("ORM queries per request.", QUERY_BUCKETS),
+}
+N_PLUS_ONE_COUNTER = 'api_n_plus_one_total'
+
+# A run of placeholders, as produced by pk__in lookups of varying length
+PLACEHOLDER_LIST = re.compile(r'(?:%s|\?)(?:\s*,\s*(?:%s|\?))+')
+
+
+def sql_shape(sql):
+    """The statement with IN-lists collapsed, so queries differing only in list length match."""
+    return PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+def view_label(view_func, method):
+    """'EventViewSet.register' for DRF views, 'module.function' for plain Django views."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f"{view_func.__module__.rsplit('.', 1)[-1]}.{view_func.__name__}"
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method.lower(), method.lower())}'
+
+# --- Storage ---
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield bound, running
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Histograms per metric and view label, shared by every thread of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in HISTOGRAMS}
+            self._n_plus_one = defaultdict(int)
+
+    def observe(self, view, **values):
+        """Record one request; `values` maps histogram names to observations."""
+        with self._lock:
+            for name, value in values.items():
+                series = self._histograms[name]
+                if view not in series:
+                    series[view] = Histogram(HISTOGRAMS[name][1])
+                series[view].observe(value)
+
+    def flag_n_plus_one(self, view):
+        with self._lock:
+            self._n_plus_one[view] += 1
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for view, histogram in sorted(self._histograms[name].items()):
+                    label = f'view="{_label(view)}"'
+                    for bound, count in histogram.cumulative_counts():
+                        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                    lines += [
+                        f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}',
+                        f'{name}_sum{{{label}}} {histogram.sum}',
+                        f'{name}_count{{{label}}} {histogram.count}',
+                    ]
+            lines += [
+                f'# HELP {N_PLUS_ONE_COUNTER} Requests that repeated one SQL shape past the N+1 threshold.',
+                f'# TYPE {N_PLUS_ONE_COUNTER} counter',
+            ]
+            for view, count in sorted(self._n_plus_one.items()):
+                lines.append(f'{N_PLUS_ONE_COUNTER}{{view="{_label(view)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# --- Collection ---
+
+class QueryRecorder:
+    """execute_wrapper that counts queries, sums their time and tallies their shapes."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+
+class Stopwatch:
+    """Accumulated time of possibly nested spans; a nested span is counted once, in its outermost one."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.depth = 0
+
+    @contextmanager
+    def span(self):
+        self.depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.seconds += time.perf_counter() - started
+
+
+# The serializer stopwatch of the request being measured, if any
+serializer_stopwatch = ContextVar('serializer_stopwatch', default=None)
+
+
+def serializer_span():
+    """Time the enclosed serializer work towards the current request, when one is measured."""
+    stopwatch = serializer_stopwatch.get()
+    return stopwatch.span() if stopwatch is not None else nullcontext()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.n_plus_one_threshold = getattr(settings, 'REQUEST_METRICS_N_PLUS_ONE_THRESHOLD', 10)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._metrics_view = None
+        request._metrics_render_seconds = 0.0
+        stopwatch = Stopwatch()
+        token = serializer_stopwatch.set(stopwatch)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            serializer_stopwatch.reset(token)
+        elapsed = time.perf_counter() - started
+
+        view = request._metrics_view or 'unresolved'
+        registry.observe(
+            view,
+            api_request_duration_seconds=elapsed,
+            api_request_sql_seconds=recorder.seconds,
+            api_request_serializer_seconds=stopwatch.seconds,
+            api_request_render_seconds=request._metrics_render_seconds,
+            api_request_queries=recorder.count,
+        )
+        repeated = [(shape, count) for shape, count in recorder.shapes.items() if count > self.n_plus_one_threshold]
+        if repeated:
+            registry.flag_n_plus_one(view)
+            for shape, count in repeated:
+                logger.warning("Possible N+1 in %s: %d x %s", view, count, shape[:300])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_label(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (encoded by the renderer) right after this hook
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_seconds = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Error responses (e.g. 403) carry a dict rather than the exposition text
+        text = data if isinstance(data, str) else json.dumps(data)
+        return text.encode(self.charset)
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 17:09
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    for event in Event.objects.annotate(
+        n_attendees=Count("attendees", distinct=True),
+        n_waitlist=Count("waitlist", distinct=True),
+    ).iterator():
+        Event.objects.filter(pk=event.pk).update(
+            attendees_count=event.n_attendees, waitlist_count=event.n_waitlist
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0003_comment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="attendees_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="waitlist_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 6.0 on 2026-10-18 17:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_waitlist(apps, schema_editor):
+    """Move rows from the old auto-created waitlist table, keeping insertion order."""
+    Event = apps.get_model("events", "Event")
+    WaitlistEntry = apps.get_model("events", "WaitlistEntry")
+    OldWaitlist = Event._meta.get_field("waitlist").remote_field.through
+    positions = {}
+    entries = []
+    for row in OldWaitlist.objects.order_by("id").iterator():
+        positions[row.event_id] = positions.get(row.event_id, 0) + 1
+        entries.append(
+            WaitlistEntry(
+                event_id=row.event_id,
+                user_id=row.customuser_id,
+                position=positions[row.event_id],
+            )
+        )
+    WaitlistEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0004_event_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WaitlistEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "position",
+                    models.PositiveBigIntegerField(
+                        help_text="Queue position within the event (FIFO)."
+                    ),
+                ),
+                ("joined_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to="events.event",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "waitlist entries",
+                "ordering": ["event", "position"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("event", "user"), name="unique_waitlist_user"
+                    ),
+                    models.UniqueConstraint(
+                        fields=("event", "position"), name="unique_waitlist_position"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(copy_waitlist, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="event",
+            name="waitlist",
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="waitlist",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="waitlisted_events",
+                through="events.WaitlistEntry",
+                through_fields=("event", "user"),
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
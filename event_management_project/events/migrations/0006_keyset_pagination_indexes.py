@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0005_waitlist_entry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["event", "created_at", "id"], name="comment_event_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["date_and_time", "id"], name="event_date_id_idx"
+            ),
+        ),
+    ]
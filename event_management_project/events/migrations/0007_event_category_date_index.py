@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0006_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["category", "date_and_time"], name="event_category_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 17:20
+
+from django.db import migrations
+
+from events.search import FTS_TABLE, PostgresSearchBackend, install_sqlite_fts
+
+POSTGRES_INDEX_NAME = "event_search_vector_idx"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        from django.contrib.postgres.indexes import GinIndex
+
+        Event = apps.get_model("events", "Event")
+        schema_editor.add_index(
+            Event,
+            GinIndex(PostgresSearchBackend().vector(), name=POSTGRES_INDEX_NAME),
+        )
+    elif vendor == "sqlite":
+        install_sqlite_fts(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX_NAME}")
+    elif vendor == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0007_event_category_date_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 6.0 on 2026-10-18 17:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+from events.search import install_sqlite_fts
+
+
+def backfill_ratings(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    Comment = apps.get_model("events", "Comment")
+    rated = Comment.objects.filter(rating__isnull=False).order_by()
+    totals = rated.values("event_id").annotate(
+        count=Count("id"),
+        total=Sum("rating"),
+        **{f"stars_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)},
+    )
+    for row in totals.iterator():
+        Event.objects.filter(pk=row["event_id"]).update(
+            rating_count=row["count"],
+            rating_sum=row["total"],
+            rating_average=row["total"] / row["count"],
+            **{f"rating_{star}": row[f"stars_{star}"] for star in range(1, 6)},
+        )
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite rebuilds events_event to add columns, which drops the FTS triggers
+    install_sqlite_fts(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0008_event_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="rating_1",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_2",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_3",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_4",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_5",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_average",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["rating_average", "date_and_time"], name="event_rating_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 6.0 on 2026-10-18 17:40
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from events.search import install_sqlite_fts
+
+
+def backfill_day_buckets(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    EventDayBucket = apps.get_model("events", "EventDayBucket")
+    rows = (
+        Event.objects.order_by()
+        .annotate(
+            day=TruncDate("date_and_time", tzinfo=timezone.get_default_timezone())
+        )
+        .values("day", "category_id")
+        .annotate(total=Count("id"))
+    )
+    EventDayBucket.objects.bulk_create(
+        [
+            EventDayBucket(
+                day=row["day"], category_id=row["category_id"], count=row["total"]
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite rebuilds events_event to add columns, which drops the FTS triggers
+    install_sqlite_fts(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0009_event_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventDayBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="geo_cell",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="latitude",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-90),
+                    django.core.validators.MaxValueValidator(90),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="longitude",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-180),
+                    django.core.validators.MaxValueValidator(180),
+                ],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["geo_cell", "date_and_time"], name="event_geo_cell_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="eventdaybucket",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="events.category",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="eventdaybucket",
+            constraint=models.UniqueConstraint(
+                fields=("day", "category"), name="unique_day_bucket"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="eventdaybucket",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("category__isnull", True)),
+                fields=("day",),
+                name="unique_day_bucket_uncategorised",
+            ),
+        ),
+        migrations.RunPython(backfill_day_buckets, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
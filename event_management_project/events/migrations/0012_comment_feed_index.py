@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0011_event_archive"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["event", "id"], name="comment_event_id_idx"),
+        ),
+    ]
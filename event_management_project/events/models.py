@@ -1,12 +1,21 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.conf import settings # To get AUTH_USER_MODEL
 
+from .geo import grid_cell
+
 # --- 1. Custom User Model ---
 
 class CustomUser(AbstractUser):
     """Extends Django's AbstractUser for custom user fields."""
-    pass 
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored credentials so signals can revoke tokens when they change
+        instance._loaded_credentials = (instance.__dict__.get('password'), instance.__dict__.get('is_active'))
+        return instance
 
 # --- 2. Category Model ---
 
@@ -35,16 +44,94 @@ class Event(models.Model):
     
     # Event capacity management
     attendees = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='attending_events', blank=True)
-    waitlist = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='waitlisted_events', blank=True)
-    
+    waitlist = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, related_name='waitlisted_events', blank=True,
+        through='WaitlistEntry', through_fields=('event', 'user')
+    )
+
+    # Denormalised counters (kept in sync by events.signals, rebuilt by `rebuild_event_counters`)
+    attendees_count = models.PositiveIntegerField(default=0, editable=False)
+    waitlist_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Comment rating aggregates (maintained incrementally by events.signals)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
     # Event Category (Foreign Key field)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True)
+
+    # Optional venue coordinates; geo_cell is their grid cell (see events.geo), set on save
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geo_cell = models.PositiveIntegerField(null=True, blank=True, editable=False)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination over upcoming events
+            models.Index(fields=['date_and_time', 'id'], name='event_date_id_idx'),
+            # EventFilter.category: upcoming events within one category
+            models.Index(fields=['category', 'date_and_time'], name='event_category_date_idx'),
+            # ?ordering=rating over upcoming events
+            models.Index(fields=['rating_average', 'date_and_time'], name='event_rating_idx'),
+            # EventFilter.near: upcoming events inside a radius's grid cells
+            models.Index(fields=['geo_cell', 'date_and_time'], name='event_geo_cell_idx'),
+        ]
+
     # Model Methods (Placed after fields)
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored day/category so signals can move the event between day buckets
+        if 'date_and_time' in instance.__dict__ and 'category_id' in instance.__dict__:
+            instance._loaded_bucket = (instance.date_and_time, instance.category_id)
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}') for star in range(1, 6)}
     
-# --- 4. Comment Model ---
+# --- 4. Waitlist Entry Model ---
+
+class WaitlistEntry(models.Model):
+    """Ordered waitlist membership; the lowest position is promoted first."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist_entries')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlist_entries')
+    position = models.PositiveBigIntegerField(help_text="Queue position within the event (FIFO).")
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['event', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_waitlist_user'),
+            # Also serves as the (event, position) index used to find the head of the queue
+            models.UniqueConstraint(fields=['event', 'position'], name='unique_waitlist_position'),
+        ]
+        verbose_name_plural = "waitlist entries"
+
+    def __str__(self):
+        return f"#{self.position} on waitlist for event {self.event_id}"
+
+# --- 5. Comment Model ---
         
 class Comment(models.Model):
     '''Model for storing comments and feedback related to an event.'''
@@ -61,6 +148,128 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Keyset pagination over one event's comments
+            models.Index(fields=['event', 'created_at', 'id'], name='comment_event_created_idx'),
+            # Incremental feed: an event's comments after a given id
+            models.Index(fields=['event', 'id'], name='comment_event_id_idx'),
+        ]
         
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so signals can apply the change incrementally
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
+
     def __str__(self):
-        return f"Comment by {self.user.username} on {self.event.title}"
\ No newline at end of file
+        # Names only when the related rows are already loaded, so printing a comment never queries
+        user = self.user.username if Comment.user.is_cached(self) else f"user {self.user_id}"
+        event = self.event.title if Comment.event.is_cached(self) else f"event {self.event_id}"
+        return f"Comment by {user} on {event}"
+
+# --- 6. Event Day Bucket Model ---
+
+class EventDayBucket(models.Model):
+    """
+    Number of events on one calendar day (in TIME_ZONE) within one category, or
+    uncategorised. Kept current by events.signals; serves the calendar endpoint.
+    """
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves as the (day, category) index for month-window reads
+            models.UniqueConstraint(fields=['day', 'category'], name='unique_day_bucket'),
+            # NULLs never collide in a unique index, so uncategorised buckets need their own
+            models.UniqueConstraint(
+                fields=['day'], condition=models.Q(category__isnull=True), name='unique_day_bucket_uncategorised'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.count} events on {self.day}"
+
+# --- 7. Archive Models ---
+# Finished events are moved here (with their attendees, waitlist and comments) by
+# `archive_events`, keeping the live tables and their indexes small. Rows keep
+# their original ids, so an archived event is found under the id it always had.
+
+class ArchivedEvent(models.Model):
+    """A past event, frozen as it was when archived."""
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    date_and_time = models.DateTimeField()
+    location = models.CharField(max_length=255)
+    organizer = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='archived_events'
+    )
+    capacity = models.PositiveBigIntegerField()
+    created_date = models.DateTimeField()
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    attendees_count = models.PositiveIntegerField(default=0)
+    waitlist_count = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_average = models.FloatField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Archive listing, most recent first
+            models.Index(fields=['date_and_time', 'id'], name='archived_event_date_id_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}') for star in range(1, 6)}
+
+
+class ArchivedAttendance(models.Model):
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='attendances')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_archived_attendance'),
+        ]
+
+
+class ArchivedWaitlistEntry(models.Model):
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='waitlist_entries')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    position = models.PositiveBigIntegerField()
+    joined_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_archived_waitlist_user'),
+        ]
+        verbose_name_plural = "archived waitlist entries"
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='comments')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    content = models.TextField()
+    rating = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event', 'created_at', 'id'], name='archived_comment_event_idx'),
+        ]
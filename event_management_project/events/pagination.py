@@ -0,0 +1,76 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# --- Page-number Pagination (legacy) ---
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """Custom pagination settings for list views."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+# --- Cursor (keyset) Pagination ---
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination that seeks on an indexed ordering instead of COUNT + OFFSET.
+    Clients that still send `?page=` (or `?pagination=page`) get the legacy
+    page-number response so existing integrations keep working.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    legacy_class = StandardResultsSetPagination
+
+    def use_page_numbers(self, request):
+        params = request.query_params
+        return self.legacy_class.page_query_param in params or params.get('pagination') == 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = None
+        if self.use_page_numbers(request):
+            self.legacy = self.legacy_class()
+            ordering = self.get_ordering(request, queryset, view)
+            return self.legacy.paginate_queryset(queryset.order_by(*ordering), request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.legacy is not None:
+            return self.legacy.to_html()
+        return super().to_html()
+
+
+class EventCursorPagination(KeysetPagination):
+    """Upcoming events, seeking on the (date_and_time, id) index."""
+    ordering = ('date_and_time', 'id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    """Comments for one event, seeking on the (event, created_at, id) index."""
+    ordering = ('created_at', 'id')
+
+
+class ArchivedEventCursorPagination(KeysetPagination):
+    """Archived events, most recent first, seeking on the (date_and_time, id) index."""
+    ordering = ('-date_and_time', '-id')
+
+
+class AttendeeCursorPagination(CursorPagination):
+    """An event's attendees, in user id order."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def get_ordering(self, request, queryset, view):
+        # Fixed order: the view's ?ordering= applies to events, not to their members
+        return self.ordering
+
+
+class WaitlistCursorPagination(AttendeeCursorPagination):
+    """An event's waitlist, head of the queue first."""
+    ordering = ('position',)
@@ -0,0 +1,85 @@
+"""
+Query-plan checks for the read endpoints (``manage.py explain_queries`` and the tests).
+
+Each endpoint is called in-process and every SELECT it issues is run through
+``EXPLAIN``. A plan line that reads one of the ``HOT_TABLES`` without an index is
+a full scan; the tests assert there are none, the command prints every plan.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import Category, Event
+
+# Tables that must never be read with a full scan on a hot endpoint. events_category is
+# not one: the category cache (events.categories) loads the whole, tiny table on purpose.
+HOT_TABLES = ('events_event', 'events_comment', 'events_waitlistentry',
+              'events_event_attendees', 'events_eventdaybucket')
+
+
+def endpoint_urls():
+    """The read endpoints whose SQL is checked, labelled for the report."""
+    event = Event.objects.filter(date_and_time__gte=timezone.now()).order_by('date_and_time').first()
+    category = Category.objects.first()
+    start = timezone.now() + timedelta(days=30)
+    urls = [
+        ('event list', '/api/v1/events/'),
+        ('event list (page mode)', '/api/v1/events/?page=50'),
+        ('event list by date range', '/api/v1/events/?date_range_start=%s&date_range_end=%s' % (
+            start.date().isoformat(), (start + timedelta(days=7)).date().isoformat())),
+    ]
+    if category is not None:
+        urls.append(('event list by category', f'/api/v1/events/?category={category.name}'))
+    urls.append(('event calendar', '/api/v1/events/calendar/?month=%s' % start.strftime('%Y-%m')))
+    located = Event.objects.filter(latitude__isnull=False).first()
+    if located is not None:
+        urls.append(('events near a point', '/api/v1/events/?near=%s,%s&radius_km=25' % (
+            located.latitude, located.longitude)))
+    if event is not None:
+        urls += [
+            ('event detail', f'/api/v1/events/{event.pk}/'),
+            ('comment list', f'/api/v1/events/{event.pk}/comments/'),
+        ]
+    return urls
+
+
+def explain(sql, params):
+    """Return the query plan lines for one statement on the current backend."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        # The human-readable detail is the last column on both SQLite and PostgreSQL
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Plan lines that read a hot table without using an index (SQLite/Postgres wording)."""
+    flagged = []
+    for line in plan:
+        upper = line.upper().strip()
+        # SQLite: "SCAN events_event" (vs "SEARCH ... USING INDEX"); PostgreSQL: "Seq Scan on ..."
+        is_scan = (upper.startswith('SCAN ') and 'INDEX' not in upper) or 'SEQ SCAN' in upper
+        if is_scan and any(t.upper() in upper for t in HOT_TABLES):
+            flagged.append(line)
+    return flagged
+
+
+def endpoint_plans(client):
+    """
+    Call every endpoint with `client` and yield ``(label, url, response, plans)``,
+    where `plans` holds ``(sql, plan lines, full scans)`` for each SELECT issued.
+    """
+    for label, url in endpoint_urls():
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        plans = []
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            # Captured SQL has parameters inlined already
+            plan = explain(sql, ())
+            plans.append((sql, plan, full_scans(plan)))
+        yield label, url, response, plans
@@ -0,0 +1,265 @@
+"""
+Registration engine for event attendance and waitlists.
+
+Every operation works on ids and touches a constant number of rows, so the
+cost of a request does not grow with the size of an event. Seats are claimed
+with a conditional ``UPDATE ... WHERE attendees_count < capacity``, which the
+database serialises per event row, so concurrent workers can never overbook.
+
+The waitlist is a FIFO queue ordered by ``WaitlistEntry.position``; whenever
+seats free up the head of the queue is promoted inside the same transaction.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    BooleanField, Case, Exists, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Value, When,
+)
+from django.utils import timezone
+
+from .caching import invalidate_user_events
+from .db import retry_on_busy
+from .models import Event, WaitlistEntry
+
+# Auto-created attendees through table (unique on (event_id, customuser_id))
+Attendance = Event.attendees.through
+
+# Upper bound on waitlist rows moved per statement when many seats open at once
+PROMOTION_BATCH_SIZE = 500
+
+# Most events one register_batch call may name
+MAX_BATCH_EVENTS = 50
+
+# --- Outcomes ---
+
+REGISTERED = 'registered'
+UNREGISTERED = 'unregistered'
+EVENT_FULL = 'event is full'
+ALREADY_REGISTERED = 'already registered'
+ADDED_TO_WAITLIST = 'added to waitlist'
+REMOVED_FROM_WAITLIST = 'removed from waitlist'
+ALREADY_WAITLISTED = 'already on waitlist'
+SEATS_AVAILABLE = 'event has free seats'
+NOT_FOUND = 'not found'
+
+# Per-event status of a user on their dashboard, in order of precedence
+ATTENDING = 'attending'
+WAITLISTED = 'waitlisted'
+ORGANIZING = 'organizing'
+
+
+def _adjust(event_id, field, delta):
+    Event.objects.filter(pk=event_id).update(**{field: F(field) + delta})
+
+
+def _insert(model, **fields):
+    """Insert a membership row; returns False if a concurrent request beat us to it."""
+    try:
+        with transaction.atomic():
+            model.objects.create(**fields)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _next_position(event_id):
+    # Index seek on (event, position): O(log n) regardless of queue length
+    last = (
+        WaitlistEntry.objects.filter(event_id=event_id)
+        .order_by('-position')
+        .values_list('position', flat=True)
+        .first()
+    )
+    return (last or 0) + 1
+
+
+def is_attending(event_id, user_id):
+    return Attendance.objects.filter(event_id=event_id, customuser_id=user_id).exists()
+
+
+def is_waitlisted(event_id, user_id):
+    return WaitlistEntry.objects.filter(event_id=event_id, user_id=user_id).exists()
+
+
+@transaction.atomic
+def promote_from_waitlist(event_id):
+    """
+    Fill free seats from the head of the waitlist, oldest entry first.
+    Returns the ids of the promoted users.
+    """
+    event = (
+        Event.objects.select_for_update()
+        .only('capacity', 'attendees_count', 'waitlist_count')
+        .get(pk=event_id)
+    )
+    free_seats = min(event.capacity - event.attendees_count, event.waitlist_count)
+    promoted = []
+    while free_seats > 0:
+        heads = list(
+            WaitlistEntry.objects.filter(event_id=event_id)
+            .order_by('position')
+            .values_list('pk', 'user_id')[:min(free_seats, PROMOTION_BATCH_SIZE)]
+        )
+        if not heads:
+            break
+        entry_ids, user_ids = zip(*heads)
+        Attendance.objects.bulk_create(
+            [Attendance(event_id=event_id, customuser_id=user_id) for user_id in user_ids]
+        )
+        WaitlistEntry.objects.filter(pk__in=entry_ids).delete()
+        Event.objects.filter(pk=event_id).update(
+            attendees_count=F('attendees_count') + len(heads),
+            waitlist_count=F('waitlist_count') - len(heads),
+        )
+        promoted.extend(user_ids)
+        free_seats -= len(heads)
+    if promoted:
+        transaction.on_commit(lambda: invalidate_user_events(*promoted))
+    return promoted
+
+
+@retry_on_busy
+@transaction.atomic
+def toggle_registration(event_id, user_id):
+    """Register the user if there is a free seat, or unregister them if already attending."""
+    # Unregister: the DELETE doubles as the membership check
+    removed, _ = Attendance.objects.filter(event_id=event_id, customuser_id=user_id).delete()
+    if removed:
+        _adjust(event_id, 'attendees_count', -1)
+        # Hand the freed seat to whoever has waited longest
+        promote_from_waitlist(event_id)
+        return UNREGISTERED
+
+    # Claim a seat atomically; zero rows updated means the event is full
+    claimed = Event.objects.filter(
+        pk=event_id, attendees_count__lt=F('capacity')
+    ).update(attendees_count=F('attendees_count') + 1)
+    if not claimed:
+        return EVENT_FULL
+
+    if not _insert(Attendance, event_id=event_id, customuser_id=user_id):
+        # A parallel request for the same user already took a seat; give ours back
+        _adjust(event_id, 'attendees_count', -1)
+        return REGISTERED
+
+    # Remove from waitlist if applicable
+    dequeued, _ = WaitlistEntry.objects.filter(event_id=event_id, user_id=user_id).delete()
+    if dequeued:
+        _adjust(event_id, 'waitlist_count', -1)
+    return REGISTERED
+
+
+@retry_on_busy
+@transaction.atomic
+def toggle_waitlist(event_id, user_id):
+    """
+    Add the user to the waitlist of a full event, or remove them if they are already
+    on it. While seats are free there is no queue to join: register instead.
+    """
+    if is_attending(event_id, user_id):
+        return ALREADY_REGISTERED
+
+    removed, _ = WaitlistEntry.objects.filter(event_id=event_id, user_id=user_id).delete()
+    if removed:
+        _adjust(event_id, 'waitlist_count', -1)
+        return REMOVED_FROM_WAITLIST
+
+    # Bumping the counter first locks the event row, so positions are handed out serially.
+    # Only a full event takes it: a queue behind free seats would never be promoted
+    queued = Event.objects.filter(
+        pk=event_id, attendees_count__gte=F('capacity')
+    ).update(waitlist_count=F('waitlist_count') + 1)
+    if not queued:
+        return SEATS_AVAILABLE
+    joined = _insert(
+        WaitlistEntry, event_id=event_id, user_id=user_id, position=_next_position(event_id)
+    )
+    if not joined:
+        _adjust(event_id, 'waitlist_count', -1)
+    return ADDED_TO_WAITLIST
+
+@retry_on_busy
+@transaction.atomic
+def register_batch(event_ids, user_id, waitlist=True):
+    """
+    Register the user for every upcoming event in `event_ids` that has a free seat,
+    and put them on the waitlist of the full ones (unless `waitlist` is False).
+    Unlike toggle_registration this never unregisters. A fixed number of set-based
+    statements does the work for any number of events. Returns {event_id: outcome}.
+    """
+    event_ids = list(dict.fromkeys(event_ids))
+    # Lock the rows first, so seat counts and memberships cannot move until commit. Always in
+    # pk order: overlapping batches locking in different orders could deadlock each other
+    events = {
+        pk: capacity - attendees
+        for pk, capacity, attendees in Event.objects.select_for_update()
+        .filter(pk__in=event_ids, date_and_time__gte=timezone.now())
+        .order_by('pk')
+        .values_list('pk', 'capacity', 'attendees_count')
+    }
+    attending = set(
+        Attendance.objects.filter(event_id__in=events, customuser_id=user_id).values_list('event_id', flat=True)
+    )
+    waiting = set(
+        WaitlistEntry.objects.filter(event_id__in=events, user_id=user_id).values_list('event_id', flat=True)
+    )
+
+    outcomes = {}
+    seated, queued = [], []
+    for event_id in event_ids:
+        if event_id not in events:
+            outcomes[event_id] = NOT_FOUND
+        elif event_id in attending:
+            outcomes[event_id] = ALREADY_REGISTERED
+        elif event_id in waiting:
+            outcomes[event_id] = ALREADY_WAITLISTED
+        elif events[event_id] > 0:
+            seated.append(event_id)
+            outcomes[event_id] = REGISTERED
+        elif waitlist:
+            queued.append(event_id)
+            outcomes[event_id] = ADDED_TO_WAITLIST
+        else:
+            outcomes[event_id] = EVENT_FULL
+
+    if seated:
+        Event.objects.filter(pk__in=seated).update(attendees_count=F('attendees_count') + 1)
+        Attendance.objects.bulk_create([Attendance(event_id=pk, customuser_id=user_id) for pk in seated])
+    if queued:
+        last_positions = dict(
+            WaitlistEntry.objects.filter(event_id__in=queued).order_by()
+            .values('event_id').annotate(last=Max('position')).values_list('event_id', 'last')
+        )
+        Event.objects.filter(pk__in=queued).update(waitlist_count=F('waitlist_count') + 1)
+        WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(event_id=pk, user_id=user_id, position=last_positions.get(pk, 0) + 1) for pk in queued
+        ])
+    return outcomes
+
+# --- Membership queries ---
+
+def user_events(user_id):
+    """
+    Upcoming events the user attends, waits for or organises, annotated with
+    `status`, `is_organizer` and `waitlist_position`. One query: each branch of
+    the OR is an index lookup (organizer, or the user column of a through table).
+    """
+    attending = Attendance.objects.filter(event_id=OuterRef('pk'), customuser_id=user_id)
+    waiting = WaitlistEntry.objects.filter(event_id=OuterRef('pk'), user_id=user_id)
+    return (
+        Event.objects.filter(date_and_time__gte=timezone.now())
+        .filter(
+            Q(organizer_id=user_id)
+            | Q(pk__in=Attendance.objects.filter(customuser_id=user_id).values('event_id'))
+            | Q(pk__in=WaitlistEntry.objects.filter(user_id=user_id).values('event_id'))
+        )
+        .annotate(
+            is_attending=Exists(attending),
+            waitlist_position=Subquery(waiting.values('position')[:1]),
+            is_organizer=ExpressionWrapper(Q(organizer_id=user_id), output_field=BooleanField()),
+        )
+        .annotate(status=Case(
+            When(is_attending=True, then=Value(ATTENDING)),
+            When(waitlist_position__isnull=False, then=Value(WAITLISTED)),
+            default=Value(ORGANIZING),
+        ))
+    )
+
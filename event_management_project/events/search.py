@@ -0,0 +1,138 @@
+"""
+Ranked full-text search over event title, description and location.
+
+The backend is chosen from ``settings.EVENT_SEARCH_BACKEND`` (a dotted path) or,
+by default, from the database vendor: SQLite uses an FTS5 index kept in sync
+by triggers, PostgreSQL uses a tsvector GIN index, and anything else falls back
+to the old ``icontains`` scan.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'events_event_fts'
+SEARCH_FIELDS = ('title', 'description', 'location')
+
+# SQLite DDL. Triggers live on events_event, so anything that rebuilds that table
+# (SQLite migrations that alter Event) must call install_sqlite_fts() again.
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, location,
+        content='events_event', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, location
+        ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END""",
+    # Re-index everything from the content table (also repairs a stale index)
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def sqlite_has_fts5(conn):
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def install_sqlite_fts(schema_editor):
+    """Create (or repair) the FTS5 table and its sync triggers; no-op elsewhere."""
+    conn = schema_editor.connection
+    if conn.vendor != 'sqlite' or not sqlite_has_fts5(conn):
+        return
+    for statement in SQLITE_FTS_DDL:
+        schema_editor.execute(statement)
+
+
+# --- Backends ---
+
+class SearchBackend:
+    """Filters an Event queryset down to matches for `query`, best match first."""
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class IContainsSearchBackend(SearchBackend):
+    """Substring match; needs no index but scans every candidate row."""
+
+    def search(self, queryset, query):
+        match = Q()
+        for field in SEARCH_FIELDS:
+            match |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(match)
+
+
+class SQLiteFTS5SearchBackend(SearchBackend):
+    """SQLite FTS5 MATCH, ordered by bm25 rank."""
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input cannot inject FTS syntax; '*' allows prefix matches
+        terms = [term.replace('"', '""') for term in query.split()]
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset
+        # Join the FTS table so SQLite drives the query from the MATCH and reads rank
+        # per hit; a correlated rank subquery would re-run the MATCH for every row.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = events_event.id', f'{FTS_TABLE} MATCH %s'],
+            params=[expression],
+            select={'search_rank': f'{FTS_TABLE}.rank'},
+        ).order_by('search_rank', 'date_and_time', 'id')
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL tsvector search ranked with ts_rank."""
+
+    config = 'english'
+
+    def vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return (
+            SearchVector('title', weight='A', config=self.config)
+            + SearchVector('location', weight='B', config=self.config)
+            + SearchVector('description', weight='C', config=self.config)
+        )
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        search_query = SearchQuery(query, config=self.config, search_type='websearch')
+        vector = self.vector()
+        return (
+            # Filtering on the same expression as the GIN index lets Postgres use it
+            queryset.annotate(search_vector=vector, search_rank=SearchRank(vector, search_query))
+            .filter(search_vector=search_query)
+            .order_by('-search_rank', 'date_and_time', 'id')
+        )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """Instantiate the configured search backend (cached for the process)."""
+    path = getattr(settings, 'EVENT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        return SQLiteFTS5SearchBackend()
+    return IContainsSearchBackend()
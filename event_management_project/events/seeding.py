@@ -0,0 +1,244 @@
+"""
+Synthetic data for benchmarks and query-plan checks.
+
+Rows are generated lazily and written in fixed-size batches, one transaction each,
+so seeding a million events keeps memory flat. Popularity is skewed the way
+real traffic is: categories, comments, attendees and waitlists follow a
+Zipf-like distribution (``skew`` is the exponent; 0 spreads them uniformly),
+and so can the users who write comments (``commenter_skew``). Apart from the
+users, rows skip the ORM and are inserted as plain tuples.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .discovery import rebuild_day_buckets
+from .geo import grid_cell
+from .models import Category, Comment, CustomUser, Event, WaitlistEntry
+from .registration import Attendance
+from .signals import refresh_counters, refresh_ratings
+
+CATEGORY_NAMES = ['Music', 'Sport', 'Tech', 'Art', 'Food', 'Business', 'Health', 'Film']
+# (latitude, longitude) of the cities seeded events cluster around
+CITY_CENTRES = [(-26.20, 28.05), (-33.92, 18.42), (-29.86, 31.03), (51.51, -0.13), (40.71, -74.01), (6.52, 3.38)]
+
+
+def _bulk_insert(model, rows, batch_size):
+    created = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return created
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights for picking from `count` ranked items, rank r weighted 1 / r**skew."""
+    total, cumulative = 0.0, []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** skew
+        cumulative.append(total)
+    return cumulative
+
+
+def _raw_insert(model, columns, rows, batch_size):
+    """
+    INSERT plain tuples with executemany, `batch_size` rows per transaction. Skips
+    model instances and signals entirely, which makes it several times faster than
+    bulk_create; used for everything but the users.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(connection.ops.quote_name(column) for column in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = f'INSERT INTO {table} ({names}) VALUES ({placeholders})'
+    created = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return created
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        created += len(batch)
+
+
+def seed_database(users=100, events=1000, comments=1000, attendees=0, waitlist=0, skew=1.0,
+                  commenter_skew=0.0, batch_size=5000, seed=0, password=None):
+    """
+    Insert synthetic users, categories, events, comments, attendances and waitlist
+    entries; returns row counts. `skew` ranks events by popularity, `commenter_skew`
+    ranks users by how much they comment. Seeded users get `password` (hashed once),
+    or an unusable one. The same arguments always produce the same data.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES]
+    # Uncategorised events take the least popular slot
+    category_choices = categories + [None]
+    category_weights = zipf_weights(len(category_choices), skew)
+
+    offset = CustomUser.objects.count()
+    # '!' is Django's unusable-password marker; hashing a million passwords is pointless here
+    password = '!' if password is None else make_password(password)
+    _bulk_insert(CustomUser, (
+        CustomUser(username=f'seed_user_{offset + i}', password=password)
+        for i in range(users)
+    ), batch_size)
+    user_ids = list(CustomUser.objects.order_by('pk').values_list('pk', flat=True))
+
+    # Counters, rating aggregates and coordinates start at their model defaults
+    event_defaults = {
+        field.attname: field.get_default() for field in Event._meta.concrete_fields if not field.primary_key
+    }
+    event_columns = list(event_defaults)
+    created_date = connection.ops.adapt_datetimefield_value(now)
+
+    def seeded_event(i):
+        event = dict(
+            event_defaults,
+            title=f'Event {i}',
+            description='Seeded event',
+            location=f'Venue {rng.randrange(500)}',
+            date_and_time=connection.ops.adapt_datetimefield_value(
+                now + timedelta(minutes=rng.randrange(-60 * 24 * 90, 60 * 24 * 365))
+            ),
+            organizer_id=rng.choice(user_ids),
+            capacity=rng.randrange(10, 1000),
+            category_id=getattr(rng.choices(category_choices, cum_weights=category_weights)[0], 'pk', None),
+            created_date=created_date,
+        )
+        # Most events get a venue near one of the cities; the rest stay without coordinates
+        if rng.random() < 0.8:
+            latitude, longitude = rng.choice(CITY_CENTRES)
+            event['latitude'] = max(-90.0, min(90.0, rng.gauss(latitude, 0.3)))
+            event['longitude'] = max(-180.0, min(180.0, rng.gauss(longitude, 0.3)))
+            event['geo_cell'] = grid_cell(event['latitude'], event['longitude'])
+        return tuple(event[column] for column in event_columns)
+
+    last_pk = Event.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    _raw_insert(Event, event_columns, (seeded_event(i) for i in range(events)), batch_size)
+    # Raw inserts skip the signals that maintain the calendar buckets
+    rebuild_day_buckets()
+    # Rank this run's events by popularity in random order, so popular events are spread over the calendar
+    event_ids = list(Event.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
+    rng.shuffle(event_ids)
+    if not event_ids:
+        comments = attendees = waitlist = 0
+    event_weights = zipf_weights(len(event_ids), skew)
+
+    def popular_event():
+        return rng.choices(event_ids, cum_weights=event_weights)[0]
+
+    if commenter_skew:
+        # Rank commenters in random order too, so heavy commenters are not just the oldest accounts
+        commenters = user_ids[:]
+        rng.shuffle(commenters)
+        commenter_weights = zipf_weights(len(commenters), commenter_skew)
+
+        def commenter():
+            return rng.choices(commenters, cum_weights=commenter_weights)[0]
+    else:
+        def commenter():
+            return rng.choice(user_ids)
+
+    created_at = connection.ops.adapt_datetimefield_value(now)
+    _raw_insert(Comment, ('event_id', 'user_id', 'content', 'rating', 'created_at'), (
+        (popular_event(), commenter(), 'Seeded comment', rng.choice([None, 1, 2, 3, 4, 5]), created_at)
+        for _ in range(comments)
+    ), batch_size)
+    if comments:
+        # Raw inserts skip the signals that maintain the rating aggregates
+        refresh_ratings()
+
+    if attendees or waitlist:
+        attendees, waitlist = seed_registrations(
+            attendees, waitlist, event_ids, event_weights, user_ids, rng, batch_size, now
+        )
+
+    return {'users': users, 'events': events, 'comments': comments, 'attendees': attendees, 'waitlist': waitlist}
+
+
+def seed_registrations(attendees, waitlist, event_ids, event_weights, user_ids, rng, batch_size, now):
+    """
+    Register up to `attendees` (event, user) pairs, never past an event's capacity,
+    then queue up to `waitlist` users behind events that are full, the most popular
+    ones getting the longest queues. Returns the number of rows of each written.
+
+    Each event walks the user list from its own random starting point, attendees
+    first and the waitlist after them, so a user never appears twice on one event
+    and the rows can go straight into the through tables without conflict checks.
+    """
+    # The events are this run's, i.e. the newest ones; a range stays clear of SQLite's parameter limit
+    capacities = dict(Event.objects.filter(pk__gte=min(event_ids)).values_list('pk', 'capacity'))
+    # An event can hold at most every user once, across both lists
+    limit = len(user_ids)
+    starts, taken, queued = {}, dict.fromkeys(event_ids, 0), dict.fromkeys(event_ids, 0)
+
+    def next_user(event_id):
+        if event_id not in starts:
+            starts[event_id] = rng.randrange(limit)
+        return user_ids[(starts[event_id] + taken[event_id] + queued[event_id]) % limit]
+
+    def attendance_rows():
+        for _ in range(attendees):
+            event_id = rng.choices(event_ids, cum_weights=event_weights)[0]
+            if taken[event_id] >= min(capacities[event_id], limit):
+                continue
+            user_id = next_user(event_id)
+            taken[event_id] += 1
+            yield event_id, user_id
+
+    attendees = _raw_insert(Attendance, ('event_id', 'customuser_id'), attendance_rows(), batch_size)
+
+    # Keep the popularity order (event_ids is ranked) among the events that filled up
+    full = [event_id for event_id in event_ids if taken[event_id] >= capacities[event_id]]
+    if full and waitlist:
+        full_weights = zipf_weights(len(full), 1.0)
+        joined_at = connection.ops.adapt_datetimefield_value(now)
+
+        def waitlist_rows():
+            for _ in range(waitlist):
+                event_id = rng.choices(full, cum_weights=full_weights)[0]
+                if taken[event_id] + queued[event_id] >= limit:
+                    continue
+                user_id = next_user(event_id)
+                queued[event_id] += 1
+                yield event_id, user_id, queued[event_id], joined_at
+
+        waitlist = _raw_insert(
+            WaitlistEntry, ('event_id', 'user_id', 'position', 'joined_at'), waitlist_rows(), batch_size
+        )
+    else:
+        waitlist = 0
+    # Raw inserts skip the m2m signals that maintain the counters
+    refresh_counters()
+    return attendees, waitlist
+
+
+@contextmanager
+def throwaway_database(keepdb=False, **seed_options):
+    """
+    Run the enclosed block against a freshly migrated test database, seeded with
+    `seed_database(**seed_options)` unless it already holds events (keepdb).
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        if not Event.objects.exists():
+            seed_database(**seed_options)
+        # Give the planner real statistics, as a long-lived database would have
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
@@ -1,9 +1,38 @@
+import time
+
 from rest_framework import serializers
-from .models import Event, CustomUser, Category, Comment
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from . import metrics
+from .categories import category_cache
+from .registration import MAX_BATCH_EVENTS
+from .models import Event, CustomUser, Category, Comment, WaitlistEntry, ArchivedEvent, ArchivedComment
+
+# Sparse Fieldsets
+
+class SparseFieldsetsMixin:
+    """Limits read output to the comma-separated `?fields=` list, when one is given."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get('fields')
+        if requested:
+            wanted = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+# Serializer Timing
+
+class TimedSerializerMixin:
+    """Counts to_representation towards the request's ``api_request_serializer_seconds``."""
+    def to_representation(self, instance):
+        with metrics.serializer_span():
+            return super().to_representation(instance)
 
 # User Registration Serialiser
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ('username', 'email', 'password')
@@ -13,13 +42,49 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user = CustomUser.objects.create_user(**validated_data)
         return user
     
+# Token Serialiser (adds the claims the token-user fast path reads)
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        # Unlike 'iat' this is copied into refreshed access tokens, and it is sub-second,
+        # so revocation can tell a login just before a password change from one just after
+        token['auth_time'] = time.time()
+        return token
+
+# Category Serialisers
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ('id', 'name')
+
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """A category id, checked against the category cache rather than with a query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        name = category_cache.name_for(pk)
+        if name is None:
+            self.fail('does_not_exist', pk_value=data)
+        # Only the id is written, so an unsaved instance carrying it is enough
+        return Category(pk=pk, name=name)
+
 # Event Serializer 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(TimedSerializerMixin, SparseFieldsetsMixin, serializers.ModelSerializer):
     organizer_username = serializers.CharField(source='organizer.username', read_only=True)
-    attendees_count = serializers.SerializerMethodField()
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     # Explicitly define category to make it writable
-    category = serializers.PrimaryKeyRelatedField(
+    category = CategoryField(
         queryset = Category.objects.all(),
         allow_null=True
     )
@@ -28,12 +93,13 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = (
             'id', 'title', 'description', 'date_and_time', 'location', 'capacity', 'created_date', 'organizer',
-            'organizer_username', 'attendees', 'waitlist', 'attendees_count', 'category'
+            'organizer_username', 'attendees', 'waitlist', 'attendees_count', 'waitlist_count', 'category',
+            'latitude', 'longitude', 'rating_count', 'rating_average', 'rating_histogram'
+        )
+        read_only_fields = (
+            'organizer', 'created_date', 'attendees', 'waitlist', 'attendees_count', 'waitlist_count',
+            'rating_count', 'rating_average'
         )
-        read_only_fields = ('organizer', 'created_date', 'attendees', 'waitlist')
-        
-    def get_attendees_count(self, obj):
-        return obj.attendees.count()
     
     # Validation: Ensure future event date (Requirement)
     def validate_date_and_time(self, value):
@@ -42,7 +108,63 @@ class EventSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Events must be in the future.")
         return value
 
-class CommentSerializer(serializers.ModelSerializer):
+    # Validation: coordinates come as a pair (a partial update may supply just one)
+    def validate(self, attrs):
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Provide both latitude and longitude, or neither.")
+        return attrs
+
+# Compact Event Serializer for list views: counts only, no attendee/waitlist id arrays
+class EventListSerializer(EventSerializer):
+    class Meta(EventSerializer.Meta):
+        fields = (
+            'id', 'title', 'description', 'date_and_time', 'location', 'capacity', 'created_date', 'organizer',
+            'organizer_username', 'attendees_count', 'waitlist_count', 'category',
+            'latitude', 'longitude', 'rating_count', 'rating_average', 'rating_histogram'
+        )
+
+# "My events" dashboard: the caller's status per event. Counts are left out so that
+# only the caller's own membership changes (and edits to the event) alter an entry.
+class UserEventSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    status = serializers.CharField(read_only=True)
+    is_organizer = serializers.BooleanField(read_only=True)
+    waitlist_position = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Event
+        fields = (
+            'id', 'title', 'date_and_time', 'location', 'capacity', 'category', 'status', 'is_organizer',
+            'waitlist_position'
+        )
+        read_only_fields = fields
+
+# Batch registration request body
+class RegisterBatchSerializer(serializers.Serializer):
+    events = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=MAX_BATCH_EVENTS
+    )
+    # Join the waitlist of events that are full (otherwise report them as full)
+    waitlist = serializers.BooleanField(default=True)
+
+# Event membership sub-resources (attendees / waitlist)
+
+class EventMemberSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ('id', 'username')
+
+
+class WaitlistEntrySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='user_id', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ('id', 'username', 'position', 'joined_at')
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_username = serializers.CharField(source='user.username', read_only=True)
     # The event ID is typically passed via the URL, so it's read-only here
     event_id = serializers.PrimaryKeyRelatedField(source='event', read_only=True)
@@ -59,4 +181,38 @@ class CommentSerializer(serializers.ModelSerializer):
     def validate_rating(self, value):
         if value is not None and (value < 1 or value > 5):
             raise serializers.ValidationError("Rating must be between 1 and 5.")
-        return value
\ No newline at end of file
+        return value
+
+# Incremental comment feed parameters (?since_id= or ?since=)
+class CommentFeedSerializer(TimedSerializerMixin, serializers.Serializer):
+    since_id = serializers.IntegerField(min_value=0, required=False)
+    since = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if ('since_id' in attrs) == ('since' in attrs):
+            raise serializers.ValidationError("Give either since_id or since.")
+        return attrs
+
+# Archive Serialisers (read-only)
+
+class ArchivedEventSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = ArchivedEvent
+        fields = (
+            'id', 'title', 'description', 'date_and_time', 'location', 'capacity', 'created_date', 'organizer',
+            'category', 'latitude', 'longitude', 'attendees_count', 'waitlist_count', 'rating_count',
+            'rating_average', 'rating_histogram', 'archived_at'
+        )
+        read_only_fields = fields
+
+
+class ArchivedCommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    event_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ArchivedComment
+        fields = ('id', 'event_id', 'user', 'user_username', 'content', 'rating', 'created_at')
+        read_only_fields = fields
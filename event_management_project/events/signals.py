@@ -0,0 +1,286 @@
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, OuterRef, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import revoke_tokens, user_cache
+from .caching import invalidate_event, invalidate_event_list, invalidate_seats
+from .categories import invalidate_categories
+from .discovery import adjust_day_buckets, bucket_day
+from .models import Category, Comment, CustomUser, Event, EventDayBucket
+from .registration import promote_from_waitlist
+
+# Maps each counted M2M through table to the Event column that mirrors its size.
+COUNTER_FIELDS = {
+    Event.attendees.through: 'attendees_count',
+    Event.waitlist.through: 'waitlist_count',
+}
+
+# Name of the user foreign key on each through table ('customuser' or 'user')
+USER_FIELDS = {
+    Event.attendees.through: Event._meta.get_field('attendees').m2m_reverse_field_name(),
+    Event.waitlist.through: Event._meta.get_field('waitlist').m2m_reverse_field_name(),
+}
+
+
+def recount_subquery(through):
+    """Correlated COUNT(*) of a through table's rows for the outer Event."""
+    counts = (
+        through.objects.filter(event_id=OuterRef('pk'))
+        .order_by()
+        .values('event_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def refresh_counters(event_ids=None):
+    """Recompute attendees_count and waitlist_count from the through tables."""
+    events = Event.objects.all()
+    if event_ids is not None:
+        events = events.filter(pk__in=event_ids)
+    return events.update(**{
+        field: recount_subquery(through) for through, field in COUNTER_FIELDS.items()
+    })
+
+
+def _recount(through, event_ids):
+    field = COUNTER_FIELDS[through]
+    Event.objects.filter(pk__in=event_ids).update(**{field: recount_subquery(through)})
+
+
+@receiver(m2m_changed)
+def sync_event_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Event counters in step with attendees/waitlist M2M writes."""
+    field = COUNTER_FIELDS.get(sender)
+    if field is None:
+        return
+
+    if action == 'pre_clear' and reverse:
+        # The cleared events are only knowable before the rows disappear
+        instance._cleared_event_ids = list(
+            sender.objects.filter(**{USER_FIELDS[sender]: instance.pk}).values_list('event_id', flat=True)
+        )
+        return
+
+    if action == 'post_add' and pk_set:
+        # Django only reports ids that were actually inserted on add
+        if reverse:
+            Event.objects.filter(pk__in=pk_set).update(**{field: F(field) + 1})
+        else:
+            Event.objects.filter(pk=instance.pk).update(**{field: F(field) + len(pk_set)})
+    elif action == 'post_remove' and pk_set:
+        # pk_set holds the requested ids, not the deleted ones, so recount
+        _recount(sender, pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        if reverse:
+            _recount(sender, getattr(instance, '_cleared_event_ids', []))
+        else:
+            Event.objects.filter(pk=instance.pk).update(**{field: 0})
+
+
+@receiver(pre_delete, sender=CustomUser)
+def remember_memberships(sender, instance, **kwargs):
+    # Deleting a user cascades to their through rows without m2m_changed, so note the events first
+    instance._member_event_ids = {
+        through: list(
+            through.objects.filter(**{USER_FIELDS[through]: instance.pk}).values_list('event_id', flat=True)
+        )
+        for through in COUNTER_FIELDS
+    }
+
+
+@receiver(post_delete, sender=CustomUser)
+def recount_memberships(sender, instance, **kwargs):
+    for through, event_ids in getattr(instance, '_member_event_ids', {}).items():
+        if event_ids:
+            _recount(through, event_ids)
+
+
+@receiver(post_delete, sender=CustomUser)
+def hand_over_seats(sender, instance, **kwargs):
+    # Runs after recount_memberships, so the freed seats show in attendees_count
+    event_ids = getattr(instance, '_member_event_ids', {}).get(Event.attendees.through)
+    if not event_ids:
+        return
+    # Events the user organised went with them. Each promotion locks its event row, so go in pk order
+    event_ids = list(Event.objects.filter(pk__in=event_ids).order_by('pk').values_list('pk', flat=True))
+    for event_id in event_ids:
+        promote_from_waitlist(event_id)
+    release_seats(event_ids)
+    for event_id in event_ids:
+        transaction.on_commit(lambda event_id=event_id: invalidate_event(event_id))
+
+
+# --- "Event full" state ---
+
+def release_seats(event_ids):
+    for event_id in event_ids:
+        transaction.on_commit(lambda event_id=event_id: invalidate_seats(event_id))
+
+
+@receiver(m2m_changed, sender=Event.attendees.through)
+def attendees_released(sender, instance, action, reverse, pk_set, **kwargs):
+    # Attendees removed outside the registration engine (admin, shell) free seats too
+    if action == 'post_remove' and pk_set:
+        release_seats(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        release_seats(getattr(instance, '_cleared_event_ids', []) if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def capacity_changed(sender, instance, created=False, **kwargs):
+    # An edit may raise the capacity; a deleted event must not keep answering "full"
+    if not created:
+        release_seats([instance.pk])
+
+# --- Comment rating aggregates ---
+
+def apply_rating(event_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one rating from an event's aggregates in a single UPDATE."""
+    if rating is None:
+        return
+    count = F('rating_count') + sign
+    total = F('rating_sum') + sign * rating
+    Event.objects.filter(pk=event_id).update(
+        rating_count=count,
+        rating_sum=total,
+        # Right-hand sides see the pre-update row, so the new average is computed from the new totals
+        rating_average=Case(
+            When(rating_count=-sign, then=Value(0.0)),
+            default=Cast(total, FloatField()) / Cast(count, FloatField()),
+        ),
+        **{f'rating_{rating}': F(f'rating_{rating}') + sign},
+    )
+
+
+def rating_subquery(aggregate, default=0, **filters):
+    """Correlated aggregate over the outer Event's rated comments."""
+    totals = (
+        Comment.objects.filter(event_id=OuterRef('pk'), rating__isnull=False, **filters)
+        .order_by()
+        .values('event_id')
+        .annotate(total=aggregate)
+        .values('total')
+    )
+    return Coalesce(Subquery(totals), Value(default))
+
+
+def refresh_ratings(event_ids=None):
+    """Recompute the rating aggregates from the comments table (e.g. after a bulk insert)."""
+    events = Event.objects.all()
+    if event_ids is not None:
+        events = events.filter(pk__in=event_ids)
+    return events.update(
+        rating_count=rating_subquery(Count('*')),
+        rating_sum=rating_subquery(Sum('rating')),
+        rating_average=rating_subquery(Avg('rating'), default=0.0),
+        **{f'rating_{star}': rating_subquery(Count('*'), rating=star) for star in range(1, 6)},
+    )
+
+
+@receiver(post_save, sender=Comment)
+def add_comment_rating(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_rating', None)
+    if previous != instance.rating:
+        apply_rating(instance.event_id, previous, -1)
+        apply_rating(instance.event_id, instance.rating, 1)
+    instance._loaded_rating = instance.rating
+
+
+def deleted_model(origin):
+    """The model whose delete() started a deletion (origin is an instance or a queryset)."""
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_rating(sender, instance, origin=None, **kwargs):
+    # Cascades are settled per event: an event's aggregates go with it, and
+    # deleting a user recomputes the events they rated (see recompute_user_ratings)
+    if deleted_model(origin) in (Event, CustomUser):
+        return
+    apply_rating(instance.event_id, getattr(instance, '_loaded_rating', instance.rating), -1)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def remember_rated_events(sender, instance, **kwargs):
+    instance._rated_event_ids = list(
+        Comment.objects.filter(user_id=instance.pk, rating__isnull=False)
+        .order_by().values_list('event_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=CustomUser)
+def recompute_user_ratings(sender, instance, **kwargs):
+    event_ids = getattr(instance, '_rated_event_ids', None)
+    if event_ids:
+        refresh_ratings(event_ids)
+
+
+# --- Daily event buckets (calendar discovery) ---
+
+@receiver(pre_save, sender=Event)
+def remember_day_bucket(sender, instance, raw=False, **kwargs):
+    # Instances not loaded with both fields (e.g. via .only()) need the stored values looked up
+    if instance._state.adding or raw or hasattr(instance, '_loaded_bucket'):
+        return
+    instance._loaded_bucket = (
+        Event.objects.filter(pk=instance.pk).values_list('date_and_time', 'category_id').first()
+    )
+
+
+@receiver(post_save, sender=Event)
+def move_day_bucket(sender, instance, created, **kwargs):
+    current = (instance.date_and_time, instance.category_id)
+    previous = None if created else getattr(instance, '_loaded_bucket', None)
+    deltas = {}
+    if previous is not None:
+        deltas[bucket_day(previous[0]), previous[1]] = -1
+    key = (bucket_day(current[0]), current[1])
+    deltas[key] = deltas.get(key, 0) + 1
+    adjust_day_buckets(deltas)
+    instance._loaded_bucket = current
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_day_bucket(sender, instance, **kwargs):
+    moment, category_id = getattr(instance, '_loaded_bucket', (instance.date_and_time, instance.category_id))
+    adjust_day_buckets({(bucket_day(moment), category_id): -1})
+
+
+@receiver(pre_delete, sender=Category)
+def uncategorise_day_buckets(sender, instance, **kwargs):
+    # The category's events become uncategorised (SET_NULL) without per-event signals
+    moved = EventDayBucket.objects.filter(category=instance, count__gt=0).values_list('day', 'count')
+    adjust_day_buckets({(day, None): count for day, count in moved})
+
+# --- Category cache ---
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_categories(sender, instance, **kwargs):
+    invalidate_categories()
+    # Calendar pages show category names, and a deleted category uncategorises its events
+    invalidate_event_list()
+
+# --- Token revocation ---
+
+@receiver(post_save, sender=CustomUser)
+def refresh_auth_state(sender, instance, created, **kwargs):
+    if created:
+        return
+    credentials = (instance.__dict__.get('password'), instance.__dict__.get('is_active'))
+    if getattr(instance, '_loaded_credentials', None) != credentials:
+        # A password change or deactivation (or an unknown prior state) ends existing sessions
+        revoke_tokens(instance.pk)
+    else:
+        user_cache.evict(instance.pk)
+    instance._loaded_credentials = credentials
+
+
+@receiver(post_delete, sender=CustomUser)
+def revoke_deleted_user(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
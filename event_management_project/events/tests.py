@@ -1,3 +1,725 @@
-from django.test import TestCase
+import csv
+import json
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import feed, metrics, registration
+from .archive import archive_cutoff, archive_events
+from .authentication import user_cache
+from .caching import get_versions, user_events_version_key
+from .categories import category_cache
+from .models import ArchivedComment, ArchivedEvent, Category, Comment, CustomUser, Event
+from .query_plans import endpoint_plans
+from .renderers import ORJSONRenderer
+from .seeding import seed_database
+
+
+def make_event(organizer, capacity=10, days=1, **fields):
+    fields = {'title': 'Event', 'description': 'Test event', 'location': 'Venue', **fields}
+    return Event.objects.create(
+        organizer=organizer, capacity=capacity, date_and_time=timezone.now() + timedelta(days=days), **fields,
+    )
+
+
+def token_client(user):
+    """A client authenticated with a JWT, so token-user actions see a TokenUser as in production."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class EventsTestCase(APITestCase):
+    def setUp(self):
+        # Responses, versions and throttle buckets live in the (process-wide) event cache
+        cache.clear()
+        user_cache.clear()
+        self.organizer = CustomUser.objects.create_user('organizer')
+
+    def make_users(self, count, prefix='user'):
+        return [CustomUser.objects.create_user(f'{prefix}{i}') for i in range(count)]
+
+# --- Registration ---
+
+class RegistrationTests(EventsTestCase):
+    def test_attendee_can_unregister_from_full_event(self):
+        event = make_event(self.organizer, capacity=1)
+        attendee, latecomer = self.make_users(2)
+        self.assertEqual(token_client(attendee).post(f'/api/v1/events/{event.pk}/register/').status_code, 201)
+        # Turned away by the database, which caches the full state...
+        response = token_client(latecomer).post(f'/api/v1/events/{event.pk}/register/')
+        self.assertEqual(response.json(), {'status': registration.EVENT_FULL})
+        # ...and the cached state must still let the attendee through
+        response = token_client(attendee).post(f'/api/v1/events/{event.pk}/register/')
+        self.assertEqual(response.json(), {'status': registration.UNREGISTERED})
+        event.refresh_from_db()
+        self.assertEqual(event.attendees_count, 0)
+
+    def test_full_event_turns_away_with_one_lookup(self):
+        event = make_event(self.organizer, capacity=1)
+        attendee, *latecomers = self.make_users(3)
+        registration.toggle_registration(event.pk, attendee.pk)
+        url = f'/api/v1/events/{event.pk}/register/'
+        token_client(latecomers[0]).post(url)
+        # The cached "full" flag leaves only the latecomer's own attendance to look up
+        with self.assertNumQueries(1):
+            response = token_client(latecomers[1]).post(url)
+        self.assertEqual(response.json(), {'status': registration.EVENT_FULL})
+
+    def test_padded_event_id_shares_the_full_state(self):
+        event = make_event(self.organizer, capacity=1)
+        attendee, latecomer = self.make_users(2)
+        registration.toggle_registration(event.pk, attendee.pk)
+        padded = f'/api/v1/events/0{event.pk}/register/'
+        self.assertEqual(token_client(latecomer).post(padded).json(), {'status': registration.EVENT_FULL})
+        token_client(attendee).post(f'/api/v1/events/{event.pk}/register/')
+        # The freed seat outdates the full state cached through the padded URL too
+        self.assertEqual(token_client(latecomer).post(padded).json(), {'status': registration.REGISTERED})
+
+class RegisterBatchTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, other = self.make_users(2)
+        self.open, self.full, self.attending, self.waiting = [make_event(self.organizer, capacity=1) for _ in range(4)]
+        self.past = make_event(self.organizer, days=-1)
+        registration.toggle_registration(self.full.pk, other.pk)
+        registration.toggle_registration(self.waiting.pk, other.pk)
+        registration.toggle_registration(self.attending.pk, self.user.pk)
+        registration.toggle_waitlist(self.waiting.pk, self.user.pk)
+
+    def register(self, **body):
+        response = token_client(self.user).post('/api/v1/events/register-batch/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return {result['event']: result['status'] for result in response.json()['results']}
+
+    def test_reports_the_outcome_per_event(self):
+        missing = self.past.pk + 100
+        ids = [self.open.pk, self.full.pk, self.attending.pk, self.waiting.pk, self.past.pk, missing]
+        self.assertEqual(self.register(events=ids), {
+            self.open.pk: registration.REGISTERED,
+            self.full.pk: registration.ADDED_TO_WAITLIST,
+            self.attending.pk: registration.ALREADY_REGISTERED,
+            self.waiting.pk: registration.ALREADY_WAITLISTED,
+            self.past.pk: registration.NOT_FOUND,
+            missing: registration.NOT_FOUND,
+        })
+        self.assertTrue(registration.is_attending(self.open.pk, self.user.pk))
+        self.assertTrue(registration.is_waitlisted(self.full.pk, self.user.pk))
+
+    def test_full_events_are_skipped_without_waitlist(self):
+        outcomes = self.register(events=[self.full.pk, self.open.pk], waitlist=False)
+        self.assertEqual(outcomes, {self.full.pk: registration.EVENT_FULL, self.open.pk: registration.REGISTERED})
+        self.assertFalse(registration.is_waitlisted(self.full.pk, self.user.pk))
+        self.full.refresh_from_db()
+        self.assertEqual(self.full.waitlist_count, 0)
+
+# --- Query counts ---
+
+class EventQueryCountTests(EventsTestCase):
+    """Reading events costs the same number of queries however many events and attendees there are."""
+
+    def make_events(self, count, attendees):
+        events = [make_event(self.organizer, days=i + 1) for i in range(count)]
+        for event in events:
+            event.attendees.add(*attendees)
+            event.waitlist.add(self.organizer, through_defaults={'position': 1})
+        return events
+
+    def test_list(self):
+        attendees = self.make_users(3)
+        for count in (2, 20):
+            Event.objects.all().delete()
+            cache.clear()
+            self.make_events(count, attendees)
+            with self.assertNumQueries(1):
+                response = APIClient().get('/api/v1/events/', {'page_size': 50})
+            self.assertEqual(len(response.json()['results']), count)
+
+    def test_detail(self):
+        event = self.make_events(1, self.make_users(20))[0]
+        # The event with its organizer, then its attendees and its waitlist
+        with self.assertNumQueries(3):
+            response = APIClient().get(f'/api/v1/events/{event.pk}/')
+        self.assertEqual(len(response.json()['attendees']), 20)
+
+# --- Concurrency ---
+
+class OverbookingTests(TransactionTestCase):
+    """Many workers registering at once never put more attendees on an event than it has seats."""
+    capacity = 5
+    workers = 20
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_registrations(self):
+        organizer = CustomUser.objects.create_user('organizer')
+        event = make_event(organizer, capacity=self.capacity)
+        users = [CustomUser.objects.create_user(f'user{i}') for i in range(self.workers * 2)]
+        start = threading.Barrier(self.workers)
+        outcomes, errors = [], []
+
+        def register(chunk):
+            start.wait()
+            try:
+                for user in chunk:
+                    outcomes.append(registration.toggle_registration(event.pk, user.pk))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=register, args=(users[i::self.workers],)) for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes.count(registration.REGISTERED), self.capacity)
+        event.refresh_from_db()
+        self.assertEqual(event.attendees.count(), self.capacity)
+        self.assertEqual(event.attendees_count, self.capacity)
+
+class CommentQueryCountTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(self.organizer)
+        self.url = f'/api/v1/events/{self.event.pk}/comments/'
+
+    def test_list(self):
+        for user in self.make_users(10):
+            Comment.objects.create(event=self.event, user=user, content='Hello', rating=4)
+        # One page of comments with their authors joined
+        with self.assertNumQueries(1):
+            response = APIClient().get(self.url)
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_create(self):
+        client = token_client(self.make_users(1)[0])
+        # The author (first use of the token), the event's existence, the insert and the rating aggregates
+        with self.assertNumQueries(4):
+            response = client.post(self.url, {'content': 'Hello', 'rating': 5}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+# --- Comment feed ---
+
+class CommentFeedTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(self.organizer)
+        self.user = self.make_users(1)[0]
+        self.url = f'/api/v1/events/{self.event.pk}/comments/'
+
+    def comment(self, content='Hello'):
+        return Comment.objects.create(event=self.event, user=self.user, content=content)
+
+    def test_since_id_returns_only_newer_comments(self):
+        seen, *new = [self.comment(str(i)) for i in range(3)]
+        body = self.client.get(self.url, {'since_id': seen.pk}).json()
+        self.assertEqual([comment['id'] for comment in body['results']], [comment.pk for comment in new])
+        self.assertEqual((body['last_id'], body['has_more']), (new[-1].pk, False))
+        # Nothing new: the client keeps its position
+        body = self.client.get(self.url, {'since_id': body['last_id']}).json()
+        self.assertEqual((body['results'], body['last_id']), ([], new[-1].pk))
+
+    def test_new_comment_reaches_a_cached_position(self):
+        seen = self.comment()
+        self.assertEqual(self.client.get(self.url, {'since_id': seen.pk}).json()['results'], [])
+        token_client(self.user).post(self.url, {'content': 'Late'}, format='json')
+        results = self.client.get(self.url, {'since_id': seen.pk}).json()['results']
+        self.assertEqual([comment['content'] for comment in results], ['Late'])
+
+    def test_long_backlog_is_read_in_pages(self):
+        Comment.objects.bulk_create(
+            Comment(event=self.event, user=self.user, content='Hello') for _ in range(feed.FEED_LIMIT + 1)
+        )
+        body = self.client.get(self.url, {'since_id': 0}).json()
+        self.assertEqual((len(body['results']), body['has_more']), (feed.FEED_LIMIT, True))
+        body = self.client.get(self.url, {'since_id': body['last_id']}).json()
+        self.assertEqual((len(body['results']), body['has_more']), (1, False))
+
+# --- Authentication ---
+
+class UserCacheTests(EventsTestCase):
+    def test_saving_a_user_drops_the_cached_copy(self):
+        staff = CustomUser.objects.create_user('staff', is_staff=True)
+        client = token_client(staff)
+        self.assertEqual(client.get('/api/v1/_metrics').status_code, 200)
+        # Loaded from the database, so unchanged credentials evict the user instead of revoking tokens
+        staff = CustomUser.objects.get(pk=staff.pk)
+        staff.is_staff = False
+        staff.save()
+        self.assertEqual(client.get('/api/v1/_metrics').status_code, 403)
+
+# --- Dashboard ---
+
+class DashboardTests(EventsTestCase):
+    url = '/api/v1/users/me/events/'
+
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(self.organizer)
+        self.members = self.make_users(5)
+        for member in self.members:
+            registration.toggle_registration(self.event.pk, member.pk)
+        self.organizer_client = APIClient()
+        self.organizer_client.force_authenticate(self.organizer)
+
+    def titles(self, user):
+        return [event['title'] for event in token_client(user).get(self.url).json()['results']]
+
+    def test_edit_reaches_cached_dashboards_without_touching_members(self):
+        self.assertEqual(self.titles(self.members[0]), ['Event'])
+        member_keys = [user_events_version_key(member.pk) for member in self.members]
+        member_versions = get_versions(*member_keys)
+        response = self.organizer_client.patch(f'/api/v1/events/{self.event.pk}/', {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        # One bump for the event, none per member
+        self.assertEqual(get_versions(*member_keys), member_versions)
+        self.assertEqual(self.titles(self.members[0]), ['Renamed'])
+
+    def test_delete_reaches_cached_dashboards(self):
+        self.assertEqual(self.titles(self.members[0]), ['Event'])
+        self.organizer_client.delete(f'/api/v1/events/{self.event.pk}/')
+        self.assertEqual(self.titles(self.members[0]), [])
+
+    def test_unchanged_dashboard_is_served_from_the_cache(self):
+        self.titles(self.members[0])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(self.members[0]), ['Event'])
+
+# --- Metrics ---
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class MetricsTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_serializer_time_has_its_own_histogram(self):
+        event = make_event(self.organizer)
+        self.assertEqual(APIClient().get(f'/api/v1/events/{event.pk}/').status_code, 200)
+        series = {}
+        for line in metrics.registry.render().splitlines():
+            if line.startswith('api_request_serializer_seconds_') and 'EventViewSet.retrieve' in line:
+                series[line.split('{')[0]] = float(line.rsplit(' ', 1)[1])
+        self.assertEqual(series['api_request_serializer_seconds_count'], 1)
+        self.assertGreater(series['api_request_serializer_seconds_sum'], 0)
+
+    def test_nested_serializers_are_timed_once(self):
+        stopwatch = metrics.Stopwatch()
+        with stopwatch.span():
+            with stopwatch.span():
+                pass
+            inner_done = stopwatch.seconds
+        self.assertEqual(inner_done, 0.0)
+        self.assertGreater(stopwatch.seconds, 0.0)
+
+# --- Counters ---
+
+class CounterTests(EventsTestCase):
+    def test_deleting_a_user_recounts_their_events(self):
+        attended, waited = make_event(self.organizer), make_event(self.organizer, capacity=1)
+        user, other = self.make_users(2)
+        registration.toggle_registration(attended.pk, user.pk)
+        registration.toggle_registration(waited.pk, other.pk)
+        registration.toggle_waitlist(waited.pk, user.pk)
+        user.delete()
+        attended.refresh_from_db()
+        waited.refresh_from_db()
+        self.assertEqual(attended.attendees_count, 0)
+        self.assertEqual((waited.attendees_count, waited.waitlist_count), (1, 0))
+
+# --- Ratings ---
+
+class RatingTests(EventsTestCase):
+    def rate(self, event, users, ratings):
+        for user, rating in zip(users, ratings):
+            Comment.objects.create(event=event, user=user, content='Rated', rating=rating)
+
+    def test_deleting_an_event_skips_per_comment_updates(self):
+        event = make_event(self.organizer)
+        self.rate(event, self.make_users(20), [5] * 20)
+        with CaptureQueriesContext(connection) as queries:
+            event.delete()
+        self.assertFalse([query for query in queries if 'rating_count' in query['sql']])
+
+    def test_deleting_a_user_recomputes_their_events(self):
+        event, other = make_event(self.organizer), make_event(self.organizer)
+        critic, fan = self.make_users(2)
+        self.rate(event, [critic, fan], [1, 5])
+        self.rate(other, [critic], [2])
+        critic.delete()
+        event.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((event.rating_count, event.rating_sum, event.rating_average, event.rating_1), (1, 5, 5.0, 0))
+        self.assertEqual((other.rating_count, other.rating_average), (0, 0.0))
+
+    def test_rating_order_pages_over_ties(self):
+        events = [make_event(self.organizer, days=i + 1) for i in range(25)]
+        Event.objects.update(rating_average=4.0)
+        client = APIClient()
+        for ordering in ('rating', '-rating'):
+            seen = []
+            for page in (1, 2, 3):
+                response = client.get('/api/v1/events/', {'ordering': ordering, 'page': page})
+                seen += [event['id'] for event in response.json()['results']]
+            self.assertEqual(seen, sorted(event.pk for event in events))
+
+    def test_deleting_a_comment_updates_its_event(self):
+        event = make_event(self.organizer)
+        self.rate(event, self.make_users(2), [2, 4])
+        Comment.objects.filter(rating=2).get().delete()
+        event.refresh_from_db()
+        self.assertEqual((event.rating_count, event.rating_average), (1, 4.0))
+
+# --- Waitlist ---
+
+class WaitlistTests(EventsTestCase):
+    def test_deleting_an_attendee_promotes_the_waitlist(self):
+        event = make_event(self.organizer, capacity=1)
+        attendee, first, second = self.make_users(3)
+        registration.toggle_registration(event.pk, attendee.pk)
+        registration.toggle_waitlist(event.pk, first.pk)
+        registration.toggle_waitlist(event.pk, second.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            attendee.delete()
+        self.assertTrue(registration.is_attending(event.pk, first.pk))
+        event.refresh_from_db()
+        self.assertEqual((event.attendees_count, event.waitlist_count), (1, 1))
+
+    def test_cannot_join_while_seats_are_free(self):
+        event = make_event(self.organizer, capacity=1)
+        user = self.make_users(1)[0]
+        response = token_client(user).post(f'/api/v1/events/{event.pk}/waitlist_toggle/')
+        self.assertEqual((response.status_code, response.json()), (400, {'status': registration.SEATS_AVAILABLE}))
+        event.refresh_from_db()
+        self.assertEqual(event.waitlist_count, 0)
+        self.assertFalse(registration.is_waitlisted(event.pk, user.pk))
+
+# --- Archive ---
+
+class ArchiveTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.past = make_event(self.organizer, capacity=1, days=-40)
+        attendee, waiting, commenter = self.make_users(3)
+        registration.toggle_registration(self.past.pk, attendee.pk)
+        registration.toggle_waitlist(self.past.pk, waiting.pk)
+        self.comment = Comment.objects.create(event=self.past, user=commenter, content='Great', rating=5)
+        self.recent = make_event(self.organizer, days=-5)
+
+    def test_moves_past_events_with_their_rows(self):
+        moved = list(archive_events(archive_cutoff(30)))
+        self.assertEqual(moved, [{'events': 1, 'attendees': 1, 'waitlist': 1, 'comments': 1}])
+        self.assertEqual(list(Event.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertFalse(Comment.objects.exists())
+        archived = ArchivedEvent.objects.get(pk=self.past.pk)
+        self.assertEqual((archived.attendances.count(), archived.waitlist_entries.count()), (1, 1))
+        # Comments keep their ids, so links to them still resolve
+        self.assertEqual(ArchivedComment.objects.get().pk, self.comment.pk)
+
+    def test_archive_endpoints_are_read_only(self):
+        list(archive_events(archive_cutoff(30)))
+        url = f'/api/v1/archive/events/{self.past.pk}/'
+        self.assertEqual([e['id'] for e in self.client.get('/api/v1/archive/events/').json()['results']],
+                         [self.past.pk])
+        self.assertEqual(self.client.get(url).json()['attendees_count'], 1)
+        comments = self.client.get(f'{url}comments/').json()['results']
+        self.assertEqual([c['content'] for c in comments], ['Great'])
+        client = token_client(self.organizer)
+        self.assertEqual(client.post('/api/v1/archive/events/', {'title': 'New'}).status_code, 405)
+        self.assertEqual(client.delete(url).status_code, 405)
+        self.assertTrue(ArchivedEvent.objects.filter(pk=self.past.pk).exists())
+
+# --- Bulk import / export ---
+
+class BulkTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.organizer)
+        self.when = (timezone.now() + timedelta(days=3)).isoformat()
+
+    def row(self, title, capacity=10):
+        return {'title': title, 'description': 'Imported', 'date_and_time': self.when,
+                'location': 'Hall', 'capacity': capacity, 'category': None}
+
+    def test_ndjson_import_reports_errors_per_row(self):
+        body = '\n'.join([json.dumps(self.row('First')), '{not json', json.dumps(self.row('Third', capacity=-1)),
+                          '', json.dumps(self.row('Fifth'))])
+        response = self.client.post('/api/v1/events/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        # Blank lines are skipped without using up a row number
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2, 3])
+        self.assertIn('capacity', response.json()['errors'][1]['errors'])
+        self.assertEqual(sorted(Event.objects.values_list('title', flat=True)), ['Fifth', 'First'])
+
+    def test_csv_import_with_only_bad_rows_is_rejected(self):
+        body = 'title,description,date_and_time,location,capacity,category\nPast,Old,2000-01-01T10:00:00Z,Hall,5,\n'
+        response = self.client.post('/api/v1/events/import/', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'created': 0, 'errors': [
+            {'row': 1, 'errors': {'date_and_time': ['Events must be in the future.']}},
+        ]})
+        self.assertFalse(Event.objects.exists())
+
+    def test_export_streams_json_lines_and_csv(self):
+        events = [make_event(self.organizer), make_event(self.organizer, days=2)]
+        response = self.client.get('/api/v1/events/export/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [event.pk for event in events])
+        response = self.client.get('/api/v1/events/export/', {'output': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [event.pk for event in events])
+
+# --- Pagination ---
+
+class PaginationTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = [make_event(self.organizer, days=day) for day in range(1, 6)]
+
+    def test_cursor_pages_follow_next_links(self):
+        seen = []
+        url = '/api/v1/events/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            self.assertNotIn('count', page)
+            seen += [event['id'] for event in page['results']]
+            url = page['next']
+        self.assertEqual(seen, [event.pk for event in self.events])
+
+    def test_page_parameter_keeps_the_numbered_response(self):
+        page = self.client.get('/api/v1/events/', {'page': 2, 'page_size': 2}).json()
+        self.assertEqual(page['count'], 5)
+        self.assertEqual([event['id'] for event in page['results']], [event.pk for event in self.events[2:4]])
+        self.assertIn('page=3', page['next'])
+
+# --- Response caching ---
+
+class ETagTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(self.organizer)
+        self.url = f'/api/v1/events/{self.event.pk}/'
+
+    def test_matching_etag_gets_a_bare_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual((response['ETag'], response.content), (etag, b''))
+
+    def test_edit_invalidates_the_cached_detail(self):
+        etag = self.client.get(self.url)['ETag']
+        token_client(self.organizer).patch(self.url, {'title': 'Renamed'}, format='json')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['title'], 'Renamed')
+
+    def test_registration_invalidates_the_cached_list(self):
+        etag = self.client.get('/api/v1/events/')['ETag']
+        token_client(self.make_users(1)[0]).post(f'{self.url}register/')
+        response = self.client.get('/api/v1/events/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['attendees_count'], 1)
+
+# --- Discovery ---
+
+class NearTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        # About 5 km north of the search point
+        self.nearby = make_event(self.organizer, latitude=52.045, longitude=13.0)
+
+    def near(self, **params):
+        response = APIClient().get('/api/v1/events/', {'near': '52.0,13.0', **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [event['id'] for event in response.json()['results']]
+
+    def test_zero_radius_is_not_the_default(self):
+        self.assertEqual(self.near(), [self.nearby.pk])
+        self.assertEqual(self.near(radius_km=0), [])
+
+    def test_radius_bounds_the_distance(self):
+        # About 30 km north
+        far = make_event(self.organizer, days=2, latitude=52.27, longitude=13.0)
+        make_event(self.organizer, days=3)
+        self.assertEqual(self.near(radius_km=25), [self.nearby.pk])
+        self.assertEqual(self.near(radius_km=35), [self.nearby.pk, far.pk])
+
+class SearchTests(EventsTestCase):
+    def search(self, query):
+        response = self.client.get('/api/v1/events/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_best_match_comes_first(self):
+        mention = make_event(self.organizer, title='Open day', description='Tours and talks. ' * 20 + 'Some jazz.')
+        headline = make_event(self.organizer, days=5, title='Jazz night', description='Jazz quartet, jazz trio')
+        make_event(self.organizer, title='Book club')
+        body = self.search('jazz')
+        self.assertEqual([event['id'] for event in body['results']], [headline.pk, mention.pk])
+        # Ranked results page by number, as a relevance order has no cursor
+        self.assertEqual(body['count'], 2)
+
+    def test_terms_match_word_prefixes(self):
+        event = make_event(self.organizer, title='Jazz night')
+        self.assertEqual([e['id'] for e in self.search('jaz nig')['results']], [event.pk])
+        self.assertEqual(self.search('night jazz club')['results'], [])
+
+
+class CalendarTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.year = timezone.now().year + 1
+        self.music = Category.objects.create(name='Music')
+
+    def on(self, month, day, **fields):
+        when = timezone.make_aware(datetime(self.year, month, day, 12))
+        return Event.objects.create(
+            title='Event', description='Test event', location='Venue', organizer=self.organizer, capacity=10,
+            date_and_time=when, **fields,
+        )
+
+    def calendar(self, **params):
+        response = self.client.get('/api/v1/events/calendar/', {'month': f'{self.year}-06', **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_counts_events_per_day_and_category(self):
+        self.on(6, 10)
+        self.on(6, 10, category=self.music)
+        self.on(6, 12, category=self.music)
+        self.on(7, 1)
+        body = self.calendar()
+        self.assertEqual((body['total'], body['categories']), (3, [
+            {'category': None, 'count': 1}, {'category': 'Music', 'count': 2},
+        ]))
+        self.assertEqual(body['days'], [
+            {'date': f'{self.year}-06-10', 'count': 2,
+             'categories': [{'category': None, 'count': 1}, {'category': 'Music', 'count': 1}]},
+            {'date': f'{self.year}-06-12', 'count': 1, 'categories': [{'category': 'Music', 'count': 1}]},
+        ])
+        self.assertEqual(self.calendar(category='Music')['total'], 2)
+
+    def test_rescheduled_event_moves_between_days(self):
+        event = self.on(6, 10)
+        event.date_and_time += timedelta(days=5)
+        event.save()
+        self.assertEqual([day['date'] for day in self.calendar()['days']], [f'{self.year}-06-15'])
+        token_client(self.organizer).delete(f'/api/v1/events/{event.pk}/')
+        self.assertEqual(self.calendar()['total'], 0)
+
+# --- Categories ---
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class CategoryCacheWithoutCacheTests(EventsTestCase):
+    """With no cache to hold the version, the category cache must still see the table."""
+
+    def setUp(self):
+        super().setUp()
+        category_cache.clear()
+        self.music = Category.objects.create(name='Music')
+        make_event(self.organizer, category=self.music)
+        make_event(self.organizer)
+
+    def test_filter_by_category_name(self):
+        response = APIClient().get('/api/v1/events/', {'category': 'Music'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_list_categories(self):
+        self.assertEqual(APIClient().get('/api/v1/categories/').json(), [{'id': self.music.pk, 'name': 'Music'}])
+
+    def test_create_event_in_category(self):
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        response = client.post('/api/v1/events/', {
+            'title': 'New', 'description': 'd', 'location': 'x', 'capacity': 5, 'category': self.music.pk,
+            'date_and_time': (timezone.now() + timedelta(days=2)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+# --- Async reads ---
+
+class AsyncReadTests(EventsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.music = Category.objects.create(name='Music')
+        self.event = make_event(self.organizer, capacity=1, location='Hall', category=self.music)
+        attendee, waiting = self.make_users(2)
+        registration.toggle_registration(self.event.pk, attendee.pk)
+        registration.toggle_waitlist(self.event.pk, waiting.pk)
+        self.other = make_event(self.organizer, days=2)
+
+    async def test_detail_matches_the_sync_endpoint(self):
+        url = f'/api/v1/events/{self.event.pk}/'
+        expected = (await sync_to_async(self.client.get)(url)).json()
+        response = await self.async_client.get(f'/api/v1/async/events/{self.event.pk}/')
+        self.assertEqual(response.json(), expected)
+
+    async def test_list_applies_the_event_filters(self):
+        async def ids(**params):
+            response = await self.async_client.get('/api/v1/async/events/', params)
+            self.assertEqual(response.status_code, 200, response.content)
+            return [event['id'] for event in response.json()['results']]
+
+        self.assertEqual(await ids(), [self.event.pk, self.other.pk])
+        self.assertEqual(await ids(location='hall'), [self.event.pk])
+        self.assertEqual(await ids(category='Music'), [self.event.pk])
+        self.assertEqual(await ids(date_range_start=self.other.date_and_time.isoformat()), [self.other.pk])
+        response = await self.async_client.get('/api/v1/async/events/', {'category': 'Nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category', response.json())
+
+# --- Rendering ---
+
+class RendererTests(TestCase):
+    def test_matches_drf_json_renderer(self):
+        data = {
+            'title': 'Line\u2028and paragraph\u2029separators \u2014 caf\u00e9 \U0001f389',
+            'date_and_time': timezone.now(),
+            'price': Decimal('12.50'),
+            'tags': [None, True, 1, 2.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+# --- Query plans ---
+
+class QueryPlanTests(TestCase):
+    """No read endpoint falls back to a full scan of a hot table (``manage.py explain_queries`` at small scale)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_database(users=50, events=1000, comments=1000, attendees=2000, waitlist=200)
+        # Planner statistics, as explain_queries gathers after seeding
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_endpoints_use_indexes(self):
+        for label, url, response, plans in endpoint_plans(APIClient()):
+            with self.subTest(label):
+                self.assertEqual(response.status_code, 200, url)
+                self.assertTrue(plans, url)
+                for sql, plan, scans in plans:
+                    self.assertEqual(scans, [], f'{sql}\n' + '\n'.join(plan))
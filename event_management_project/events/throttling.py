@@ -0,0 +1,81 @@
+"""
+Token-bucket throttles for the registration endpoints.
+
+A bucket holds up to N tokens and refills at N per period, from the DRF rate
+string ``'N/period'`` configured under ``DEFAULT_THROTTLE_RATES``. Each request
+takes one token. An empty bucket answers 429 with ``Retry-After``. Unlike DRF's
+sliding-window throttles, the state is one small ``(tokens, timestamp)`` pair
+per bucket, so a rush of thousands of requests costs one cache read and write
+each. Buckets live in the event cache (``caching.get_cache``). Like DRF's own
+throttles, the read-modify-write is not atomic, so a burst can slip a few
+requests past a nearly empty bucket.
+
+Setting a scope's rate to None switches its throttle off.
+"""
+import math
+import time
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .caching import get_cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'N/period' -> (bucket size, tokens added per second)."""
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.wait_seconds = None
+
+    def get_ident(self, request, view):
+        """What the bucket is keyed on, or None to not throttle the request."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        ident = self.get_ident(request, view)
+        if ident is None:
+            return True
+        size, refill = parse_rate(self.rate)
+        key = f'throttle:{self.scope}:{ident}'
+        cache = get_cache()
+        now = time.time()
+        tokens, stamp = cache.get(key, (size, now))
+        tokens = min(size, tokens + (now - stamp) * refill)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.wait_seconds = (1 - tokens) / refill
+        # Once the bucket would be full again the entry can go: a missing entry means full
+        cache.set(key, (tokens, now), timeout=math.ceil((size - tokens) / refill) + 1)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserRegistrationThrottle(TokenBucketThrottle):
+    """One bucket per user, shared by all of their register/waitlist calls."""
+    scope = 'registration_user'
+
+    def get_ident(self, request, view):
+        return request.user.pk if request.user and request.user.is_authenticated else None
+
+
+class EventRegistrationThrottle(TokenBucketThrottle):
+    """One bucket per event, shared by every user registering for it."""
+    scope = 'registration_event'
+
+    def get_ident(self, request, view):
+        return view.kwargs.get(view.lookup_url_kwarg or view.lookup_field)
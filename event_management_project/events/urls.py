@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
-from .views import EventViewSet, CommentViewSet
+from .views import EventViewSet, CommentViewSet, ArchivedEventViewSet, CategoryViewSet, MetricsView
+from . import async_views
 
 router = DefaultRouter()
 router.register('events', EventViewSet, basename='event')
+router.register('categories', CategoryViewSet, basename='category')
+router.register('archive/events', ArchivedEventViewSet, basename='archived-event')
 
 # Nested Router for Comment
 comments_router = routers.NestedDefaultRouter(router, 'events', lookup='event')
@@ -13,4 +16,11 @@ comments_router.register('comments', CommentViewSet, basename='event-comments')
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(comments_router.urls)),
+    # Request metrics for Prometheus (collected when REQUEST_METRICS_ENABLED is set)
+    path('_metrics', MetricsView.as_view(), name='metrics'),
+    # Async read endpoints (serve with an ASGI server, e.g. uvicorn workers)
+    path('async/events/', async_views.event_list, name='async-event-list'),
+    path('async/events/<int:pk>/', async_views.event_detail, name='async-event-detail'),
+    path('async/events/<int:event_pk>/comments/', async_views.comment_list, name='async-event-comments'),
+    path('async/events/<int:event_pk>/comments/stream/', async_views.comment_stream, name='async-event-comment-stream'),
 ]
\ No newline at end of file
@@ -1,24 +1,52 @@
 from rest_framework import viewsets, mixins, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly 
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly, IsAdminUser
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 
-from .models import Event, CustomUser, Comment
-from .serializers import EventSerializer, UserRegistrationSerializer, CommentSerializer
+from .models import Event, CustomUser, Category, Comment, WaitlistEntry, ArchivedEvent, ArchivedComment
+from .serializers import (
+    EventSerializer, EventListSerializer, EventMemberSerializer, WaitlistEntrySerializer,
+    UserRegistrationSerializer, CommentSerializer, ArchivedEventSerializer, ArchivedCommentSerializer,
+    CategorySerializer, UserEventSerializer, RegisterBatchSerializer, CommentFeedSerializer,
+)
 from .permissions import IsOrganizerOrReadOnly, IsAuthenticatedAndSelf
-from .filters import EventFilter 
-from rest_framework.pagination import PageNumberPagination
+from .throttling import EventRegistrationThrottle, UserRegistrationThrottle
+from .filters import EventFilter, EventOrderingFilter
+from . import registration
+from . import bulk
+from . import discovery
+from . import feed
+from . import metrics
+from .categories import CATEGORIES_VERSION, category_cache
+from .caching import (
+    CachedReadMixin, LIST_VERSION, cached_response, comments_version_key, event_version_key, get_versions,
+    fields_versions, invalidate_comments, invalidate_event, invalidate_event_fields, invalidate_event_list,
+    invalidate_seats, invalidate_user_events, is_known_full, params_digest, remember_full, seats_version,
+    user_events_version_key,
+)
+from .pagination import (
+    EventCursorPagination, CommentCursorPagination, StandardResultsSetPagination,
+    AttendeeCursorPagination, WaitlistCursorPagination, ArchivedEventCursorPagination,
+)
 
-# --- Pagination Class ---
+# HTTP status returned for each registration engine outcome
+REGISTRATION_STATUS_CODES = {
+    registration.REGISTERED: status.HTTP_201_CREATED,
+    registration.UNREGISTERED: status.HTTP_200_OK,
+    registration.EVENT_FULL: status.HTTP_400_BAD_REQUEST,
+    registration.ALREADY_REGISTERED: status.HTTP_400_BAD_REQUEST,
+    registration.ADDED_TO_WAITLIST: status.HTTP_201_CREATED,
+    registration.REMOVED_FROM_WAITLIST: status.HTTP_200_OK,
+    registration.SEATS_AVAILABLE: status.HTTP_400_BAD_REQUEST,
+}
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """Custom pagination settings for list views."""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-    
 # --- 1. User Management ViewSet (CRUD for Users) ---
 
 class UserViewSet(mixins.RetrieveModelMixin,
@@ -32,25 +60,104 @@ class UserViewSet(mixins.RetrieveModelMixin,
     queryset = CustomUser.objects.all()
     serializer_class = UserRegistrationSerializer 
     permission_classes = [IsAuthenticated, IsAuthenticatedAndSelf]
+    token_user_actions = ('my_events',)
+
+    # "My events" dashboard (cached per user)
+    @action(detail=False, methods=['get'], url_path='me/events', pagination_class=EventCursorPagination)
+    def my_events(self, request):
+        """The caller's upcoming events, soonest first, with their status in each (`?status=`)."""
+        (version,) = get_versions(user_events_version_key(request.user.pk))
+        key = f'users:{request.user.pk}:events:{version}:{params_digest(request)}'
+        # Edits to the listed events are caught by their fields versions, not by bumping every member
+        return cached_response(
+            request, key, lambda: self.user_events_page(request), stamp=lambda data: fields_versions(data['results'])
+        )
+
+    def user_events_page(self, request):
+        events = registration.user_events(request.user.pk)
+        wanted = request.query_params.get('status')
+        if wanted:
+            if wanted not in (registration.ATTENDING, registration.WAITLISTED, registration.ORGANIZING):
+                return Response(
+                    {'status': ["Use attending, waitlisted or organizing."]}, status=status.HTTP_400_BAD_REQUEST
+                )
+            events = events.filter(status=wanted)
+        page = self.paginate_queryset(events)
+        return self.get_paginated_response(UserEventSerializer(page, many=True).data)
 
 # --- 2. Event CRUD and Viewing Events ViewSet ---
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(CachedReadMixin, viewsets.ModelViewSet):
     """
     CRUD operations for Events, including filtering, registration, and waitlist management.
     """
     serializer_class = EventSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, EventOrderingFilter]
     filterset_class = EventFilter
-    pagination_class = StandardResultsSetPagination
+    ordering_fields = ['date_and_time', 'rating_average']
+    ordering = ('date_and_time', 'id')
+    pagination_class = EventCursorPagination
+    # Actions that only need the caller's id, which the token claims carry
+    token_user_actions = (
+        'list', 'retrieve', 'calendar', 'attendees', 'waitlist', 'register', 'waitlist_toggle', 'register_batch',
+    )
 
     def get_queryset(self):
         # View Upcoming Events: Filter events where date_and_time is in the future
-        return Event.objects.filter(date_and_time__gte=timezone.now()).order_by('date_and_time')
+        upcoming = Event.objects.filter(date_and_time__gte=timezone.now())
+        if self.action in ['register', 'waitlist_toggle', 'attendees', 'waitlist']:
+            # These only need the row itself; membership is read from the through tables
+            return upcoming
+        if self.action == 'list':
+            # The compact list representation needs no M2M rows at all
+            # ...and renders the category as its id, so only the organizer is joined
+            return upcoming.select_related('organizer').order_by('date_and_time')
+
+        # Related rows are loaded up front so a page costs a fixed number of queries
+        member_ids = CustomUser.objects.only('id')
+        return (
+            upcoming
+            .select_related('organizer')
+            .prefetch_related(
+                Prefetch('attendees', queryset=member_ids),
+                Prefetch('waitlist', queryset=member_ids),
+            )
+            .order_by('date_and_time')
+        )
+
+    @property
+    def paginator(self):
+        # Relevance order cannot be expressed as a keyset cursor, so ranked searches page by number
+        if not hasattr(self, '_paginator') and self.request.query_params.get('q'):
+            self._paginator = StandardResultsSetPagination()
+        return super().paginator
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return EventListSerializer
+        return EventSerializer
+
+    def initial(self, request, *args, **kwargs):
+        # One spelling per event id, so '/events/05/' shares cache keys and throttle buckets with '/events/5/'
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        if lookup in self.kwargs:
+            try:
+                self.kwargs[lookup] = int(self.kwargs[lookup])
+            except ValueError:
+                raise NotFound()
+        super().initial(request, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        if self.action in ['list', 'calendar']:
+            (version,) = get_versions(LIST_VERSION)
+            return f'events:{self.action}:{version}:{params_digest(request)}'
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        (version,) = get_versions(event_version_key(pk))
+        return f'events:detail:{pk}:{version}:{params_digest(request)}'
 
     def get_permissions(self):
         """Set permissions based on action."""
-        if self.action in ['create', 'register', 'waitlist_toggle']: # Create & custom actions need auth
+        if self.action in ['create', 'register', 'waitlist_toggle', 'register_batch', 'bulk_import', 'export']: # Create & custom actions need auth
             self.permission_classes = [IsAuthenticated]
         elif self.action in ['update', 'partial_update', 'destroy']: # Update/Delete needs IsOrganizer
             self.permission_classes = [IsAuthenticated, IsOrganizerOrReadOnly]
@@ -60,46 +167,130 @@ class EventViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         # Set the organizer to the current logged-in user
-        serializer.save(organizer=self.request.user)
+        event = serializer.save(organizer=self.request.user)
+        invalidate_event(event.pk)
+        invalidate_user_events(event.organizer_id)
+
+    def perform_update(self, serializer):
+        # A capacity increase frees seats, so promote waitlisted users in the same transaction
+        with transaction.atomic():
+            event = serializer.save()
+            if registration.promote_from_waitlist(event.pk):
+                event.refresh_from_db(fields=['attendees_count', 'waitlist_count'])
+        invalidate_event_fields(event.pk)
+
+    def perform_destroy(self, instance):
+        event_id = instance.pk
+        instance.delete()
+        invalidate_event_fields(event_id)
+        invalidate_comments(event_id)
+
+    # Event Membership (paginated attendees / waitlist)
+    @action(detail=True, methods=['get'])
+    def attendees(self, request, pk=None):
+        """Lists the users attending an event."""
+        event = self.get_object()
+        members = CustomUser.objects.filter(attending_events=event).only('id', 'username')
+        return self.paginated_members(members, EventMemberSerializer, AttendeeCursorPagination())
+
+    @action(detail=True, methods=['get'])
+    def waitlist(self, request, pk=None):
+        """Lists an event's waitlist in promotion order."""
+        event = self.get_object()
+        entries = WaitlistEntry.objects.filter(event=event).select_related('user')
+        return self.paginated_members(entries, WaitlistEntrySerializer, WaitlistCursorPagination())
+
+    def paginated_members(self, queryset, serializer_class, paginator):
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data)
+
+    # Calendar Discovery (precomputed daily counts)
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Per-day and per-category event counts for a month (`?month=YYYY-MM`, `?category=`)."""
+        return self._cached(self.month_counts, request)
+
+    def month_counts(self, request):
+        try:
+            first_day = discovery.parse_month(request.query_params.get('month'))
+        except ValueError:
+            return Response({'month': ["Use the YYYY-MM format."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(discovery.month_counts(first_day, request.query_params.get('category')))
+
+    # Bulk Import/Export (JSON Lines or CSV)
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[bulk.JSONLinesParser, bulk.JSONLParser, bulk.CSVParser])
+    def bulk_import(self, request):
+        """Creates many events from a JSON Lines or CSV body; reports errors per row."""
+        created, errors = bulk.import_events(request.data, organizer=request.user)
+        if created:
+            invalidate_event_list()
+            invalidate_user_events(request.user.pk)
+        code = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=code)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Streams every event as JSON Lines (default) or CSV (`?output=csv`)."""
+        if request.query_params.get('output') == 'csv':
+            response = StreamingHttpResponse(bulk.export_csv(), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="events.csv"'
+        else:
+            response = StreamingHttpResponse(bulk.export_jsonl(), content_type='application/x-ndjson')
+        return response
 
     # Event Capacity Management (Enroll/Unenroll)
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+            throttle_classes=[UserRegistrationThrottle, EventRegistrationThrottle])
     def register(self, request, pk=None):
         """Allows an authenticated user to register for or unregister from an event."""
+        # Read before the database decides, so a seat freed meanwhile outdates what we cache
+        version = seats_version(pk)
+        if is_known_full(pk, version) and not registration.is_attending(pk, request.user.pk):
+            # Turned away with one index lookup: no event row, no transaction
+            outcome = registration.EVENT_FULL
+            return Response({'status': outcome}, status=REGISTRATION_STATUS_CODES[outcome])
         event = self.get_object()
-        user = request.user
-
-        # Unregister logic
-        if user in event.attendees.all():
-            event.attendees.remove(user)
-            return Response({'status': 'unregistered'}, status=status.HTTP_200_OK)
-
-        # Register logic
-        if event.attendees.count() < event.capacity:
-            event.attendees.add(user)
-            # Remove from waitlist if applicable
-            if user in event.waitlist.all():
-                event.waitlist.remove(user)
-            return Response({'status': 'registered'}, status=status.HTTP_201_CREATED)
+        outcome = registration.toggle_registration(event.pk, request.user.pk)
+        if outcome == registration.EVENT_FULL:
+            remember_full(pk, version)
         else:
-            return Response({'status': 'event is full'}, status=status.HTTP_400_BAD_REQUEST)
+            if outcome == registration.UNREGISTERED:
+                invalidate_seats(pk)
+            invalidate_event(event.pk)
+            invalidate_user_events(request.user.pk)
+        return Response({'status': outcome}, status=REGISTRATION_STATUS_CODES[outcome])
+
+    # Batch Registration (one transaction for many events)
+    @action(detail=False, methods=['post'], url_path='register-batch', permission_classes=[IsAuthenticated],
+            throttle_classes=[UserRegistrationThrottle])
+    def register_batch(self, request):
+        """Registers the user for (or waitlists them on) every listed event; reports the outcome per event."""
+        serializer = RegisterBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = registration.register_batch(
+            serializer.validated_data['events'], request.user.pk, waitlist=serializer.validated_data['waitlist']
+        )
+        changed = [pk for pk, outcome in outcomes.items() if outcome in (
+            registration.REGISTERED, registration.ADDED_TO_WAITLIST,
+        )]
+        for event_id in changed:
+            invalidate_event(event_id)
+        if changed:
+            invalidate_user_events(request.user.pk)
+        return Response({'results': [{'event': pk, 'status': outcome} for pk, outcome in outcomes.items()]})
 
     # Optional Waitlist Toggle
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+            throttle_classes=[UserRegistrationThrottle, EventRegistrationThrottle])
     def waitlist_toggle(self, request, pk=None):
         """Allows an authenticated user to join or leave the waitlist."""
         event = self.get_object()
-        user = request.user
-
-        if user in event.attendees.all():
-            return Response({'status': 'already registered'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if user in event.waitlist.all():
-            event.waitlist.remove(user)
-            return Response({'status': 'removed from waitlist'}, status=status.HTTP_200_OK)
-        else:
-            event.waitlist.add(user)
-            return Response({'status': 'added to waitlist'}, status=status.HTTP_201_CREATED)
+        outcome = registration.toggle_waitlist(event.pk, request.user.pk)
+        if outcome not in (registration.ALREADY_REGISTERED, registration.SEATS_AVAILABLE):
+            invalidate_event(event.pk)
+            invalidate_user_events(request.user.pk)
+        return Response({'status': outcome}, status=REGISTRATION_STATUS_CODES[outcome])
     
 # --- 3. Comment Permissions ---
 
@@ -114,20 +305,108 @@ class IsCommentOwnerOrReadOnly(permissions.BasePermission):
 
 # --- 4. Comment ViewSet ---
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(CachedReadMixin, viewsets.ModelViewSet):
     """CRUD operations for Comments, typically nested under an Event."""
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsCommentOwnerOrReadOnly]
+    pagination_class = CommentCursorPagination
+    token_user_actions = ('list', 'retrieve')
 
     def get_queryset(self):
         # Retrieve the event_pk from the URL kwargs provided by the nested router
         event_id = self.kwargs.get('event_pk')
         if event_id:
-            # Filter comments to only show those belonging to the specified event
-            return Comment.objects.filter(event_id=event_id)
+            # Filter comments to only show those belonging to the specified event;
+            # the author is joined because every row renders `user_username`
+            return Comment.objects.filter(event_id=event_id).select_related('user')
         return Comment.objects.none()
 
+    def get_cache_key(self, request):
+        # Only the comment list is cached; single comments are rarely read
+        if self.action != 'list':
+            return None
+        event_id = self.kwargs.get('event_pk')
+        (version,) = get_versions(comments_version_key(event_id))
+        return f'events:comments:{event_id}:{version}:{params_digest(request)}'
+
+    def list(self, request, *args, **kwargs):
+        if 'since_id' in request.query_params or 'since' in request.query_params:
+            return self._cached(self.new_comments, request)
+        return super().list(request, *args, **kwargs)
+
+    def new_comments(self, request):
+        """Up to 100 comments newer than `?since_id=` (or `?since=<timestamp>`), oldest first."""
+        params = CommentFeedSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        since_id = params.validated_data.get('since_id')
+        comments = feed.comments_after(self.kwargs['event_pk'], since_id, params.validated_data.get('since'))
+        return Response(feed.feed_page(comments, since_id))
+
     def perform_create(self, serializer):
-        # Automatically set the 'event' and 'user' fields upon creation
-        event = Event.objects.get(pk=self.kwargs['event_pk'])
-        serializer.save(user=self.request.user, event=event)
\ No newline at end of file
+        # Automatically set the 'event' and 'user' fields upon creation; the event only
+        # has to exist, so it is checked by id instead of being loaded
+        event_id = self.kwargs['event_pk']
+        if not (event_id.isdigit() and Event.objects.filter(pk=event_id).exists()):
+            raise NotFound("No Event matches the given query.")
+        event_id = int(event_id)
+        serializer.save(user=self.request.user, event_id=event_id)
+        invalidate_comments(event_id)
+
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        invalidate_comments(comment.event_id)
+
+    def perform_destroy(self, instance):
+        event_id = instance.event_id
+        instance.delete()
+        invalidate_comments(event_id)
+
+# --- 5. Event Archive (read-only) ---
+
+class ArchivedEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """Past events moved out of the live tables by `archive_events`, most recent first."""
+    queryset = ArchivedEvent.objects.all()
+    serializer_class = ArchivedEventSerializer
+    permission_classes = [AllowAny]
+    pagination_class = ArchivedEventCursorPagination
+    token_user_actions = ('list', 'retrieve', 'comments')
+
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """An archived event's comments, oldest first."""
+        event = self.get_object()
+        comments = ArchivedComment.objects.filter(event=event).select_related('user')
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        return paginator.get_paginated_response(ArchivedCommentSerializer(page, many=True).data)
+
+# --- 6. Categories (read-only, cached) ---
+
+class CategoryViewSet(CachedReadMixin, viewsets.ReadOnlyModelViewSet):
+    """Every category, by name. Served from the category cache, with an ETag."""
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    token_user_actions = ('list', 'retrieve')
+
+    def get_cache_key(self, request):
+        (version,) = get_versions(CATEGORIES_VERSION)
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        return f'categories:{self.action}:{version}:{pk}'
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(self.all_categories, request)
+
+    def all_categories(self, request):
+        return Response([{'id': pk, 'name': name} for pk, name in category_cache.items()])
+
+# --- 7. Request Metrics ---
+
+class MetricsView(APIView):
+    """Per-endpoint request histograms in the Prometheus text format (staff only)."""
+    permission_classes = [IsAdminUser]
+    renderer_classes = [metrics.PrometheusRenderer]
+
+    def get(self, request):
+        return Response(metrics.registry.render())